@@ -0,0 +1,176 @@
+import json
+import os
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hiring_cv_bias.bias_detection.fuzzy.occupations import (
+    OccupationDictionary,
+    occupation_dictionary,
+)
+
+
+def unit_rows(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # column indices of the k largest scores of each row, best first
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file index for cosine top-k search over unit vectors.
+
+    The vectors are clustered with spherical k-means into `n_lists` lists.
+    A query is only compared with the vectors of the `n_probe` lists whose
+    centroids are closest, which trades a little recall for a search cost of
+    roughly n_probe / n_lists of the exhaustive one. Vectors are stored
+    grouped by list, so each probe is one contiguous block.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        labels: List[str],
+        n_probe: int = 8,
+    ) -> None:
+        self.centroids = centroids
+        self.vectors = vectors  # grouped by list, row i is labels[i]
+        self.offsets = offsets  # list l holds rows offsets[l]:offsets[l + 1]
+        self.labels = labels
+        self.n_probe = n_probe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        labels: Sequence[str],
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 20,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        vectors = unit_rows(vectors)
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("IVFIndex.build needs at least one vector")
+        # never more lists than vectors
+        n_lists = min(n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(seed)
+
+        centroids = vectors[rng.choice(n, n_lists, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            # empty lists restart from random vectors
+            sums[empty] = vectors[rng.choice(n, int(empty.sum()), replace=False)]
+            centroids = unit_rows(sums)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assign, minlength=n_lists))]
+        )
+        return cls(
+            centroids,
+            vectors[order],
+            offsets,
+            [labels[i] for i in order],
+            n_probe,
+        )
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, rows) of the k nearest vectors of every query, best first."""
+        queries = unit_rows(np.atleast_2d(queries))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = top_k(queries @ self.centroids.T, n_probe)
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        # one block matmul per list, for all the queries probing it
+        for lst in np.unique(probes):
+            q = np.flatnonzero((probes == lst).any(axis=1))
+            start, end = self.offsets[lst], self.offsets[lst + 1]
+            if start == end:
+                continue
+            scores = np.hstack([best_scores[q], queries[q] @ self.vectors[start:end].T])
+            rows = np.hstack(
+                [
+                    best_rows[q],
+                    np.broadcast_to(np.arange(start, end), (len(q), end - start)),
+                ]
+            )
+            keep = top_k(scores, k)
+            best_scores[q] = np.take_along_axis(scores, keep, axis=1)
+            best_rows[q] = np.take_along_axis(rows, keep, axis=1)
+        return best_scores, best_rows
+
+    def exact_search(
+        self, queries: np.ndarray, k: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # exhaustive cosine search, the reference for recall
+        scores = unit_rows(np.atleast_2d(queries)) @ self.vectors.T
+        rows = top_k(scores, k)
+        return np.take_along_axis(scores, rows, axis=1), rows
+
+    def query(
+        self, queries: np.ndarray, k: int = 10, n_probe: Optional[int] = None
+    ) -> List[List[Tuple[str, float]]]:
+        scores, rows = self.search(queries, k, n_probe)
+        return [
+            [(self.labels[r], float(s)) for s, r in zip(q_scores, q_rows) if r >= 0]
+            for q_scores, q_rows in zip(scores, rows)
+        ]
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        with open(os.path.join(path, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump({"labels": self.labels, "n_probe": self.n_probe}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        # the vector matrix is memory-mapped, not read
+        with open(os.path.join(path, "labels.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(path, "centroids.npy")),
+            np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "offsets.npy")),
+            meta["labels"],
+            meta["n_probe"],
+        )
+
+
+def build_occupation_index(
+    encode: Callable[[List[str]], np.ndarray],
+    dictionary: Optional[OccupationDictionary] = None,
+    alternative: bool = True,
+    **kwargs,
+) -> IVFIndex:
+    """
+    Index of the ESCO labels embedded with `encode`, e.g.
+    SemanticMatcher().embeddings.encode; map hits back to occupations with
+    dictionary.occupations(label).
+    """
+    dictionary = dictionary or occupation_dictionary()
+    labels = list(dict.fromkeys(dictionary.jobs(alternative)))
+    return IVFIndex.build(encode(labels), labels, **kwargs)
@@ -0,0 +1,88 @@
+import time
+from typing import List, Sequence, Set
+
+import numpy as np
+import polars as pl
+import spacy
+from spacy.matcher import PhraseMatcher
+
+from hiring_cv_bias.bias_detection.fuzzy.ann import IVFIndex
+from hiring_cv_bias.bias_detection.fuzzy.parser import SPACY_MODEL, JobParser
+
+
+def row_loop_jobs(texts: Sequence[str], job_list: List[str]) -> List[Set[str]]:
+    # the previous parse_df: full pipeline, one call per CV
+    nlp = spacy.load(SPACY_MODEL)
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    matcher.add("Jobs", [nlp.make_doc(job) for job in job_list])
+    found = []
+    for text in texts:
+        doc = nlp(text)
+        found.append({doc[start:end].text for _, start, end in matcher(doc)})
+    return found
+
+
+def benchmark_job_parser(
+    texts: Sequence[str],
+    job_list: List[str],
+    batch_size: int = 256,
+    n_process: Sequence[int] = (1, 2),
+) -> pl.DataFrame:
+    df = pl.DataFrame({"CANDIDATE_ID": range(len(texts)), "Translated_CV": texts})
+
+    start = time.perf_counter()
+    reference = row_loop_jobs(texts, job_list)
+    timings = {"row loop, full pipeline": time.perf_counter() - start}
+
+    parser = JobParser(job_list)
+    for n in n_process:
+        start = time.perf_counter()
+        jobs = parser.parse_df(df, batch_size=batch_size, n_process=n)
+        timings[f"nlp.pipe, tokenizer only, n_process={n}"] = (
+            time.perf_counter() - start
+        )
+
+        found = (
+            jobs.group_by("CANDIDATE_ID", maintain_order=True)
+            .agg(pl.col("Job_Title").drop_nulls())
+            .get_column("Job_Title")
+        )
+        same = sum(set(a) == b for a, b in zip(found, reference))
+        print(f"n_process={n}: identical job titles on {same} / {len(texts)} CVs")
+
+    return pl.DataFrame(
+        {"method": list(timings), "seconds": list(timings.values())}
+    ).with_columns((len(texts) / pl.col("seconds")).alias("cvs_per_s"))
+
+
+def benchmark_ann(
+    index: IVFIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    n_probes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+) -> pl.DataFrame:
+    # recall@k against exhaustive cosine search, and latency per query
+    start = time.perf_counter()
+    _, exact = index.exact_search(queries, k)
+    rows = [
+        {
+            "method": "exhaustive",
+            "n_probe": index.n_lists,
+            "recall": 1.0,
+            "ms_per_query": 1000 * (time.perf_counter() - start) / len(queries),
+        }
+    ]
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        _, found = index.search(queries, k, n_probe=n_probe)
+        elapsed = time.perf_counter() - start
+        hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact))
+        rows.append(
+            {
+                "method": "ivf",
+                "n_probe": n_probe,
+                "recall": hits / exact.size,
+                "ms_per_query": 1000 * elapsed / len(queries),
+            }
+        )
+    return pl.DataFrame(rows)
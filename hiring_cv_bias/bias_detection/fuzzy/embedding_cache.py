@@ -0,0 +1,192 @@
+import fcntl
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from hiring_cv_bias.bias_detection.fuzzy.quantization import (
+    STORAGE_DTYPES,
+    check_precision,
+    quantize,
+)
+from hiring_cv_bias.config import CACHE_DIR
+
+EMBEDDINGS_DIR = CACHE_DIR + "embeddings/"
+
+VECTOR_FILES = {
+    "float32": "vectors.f32",
+    "float16": "vectors.f16",
+    "int8": "vectors.i8",
+}
+
+
+def normalize_key(text: str) -> str:
+    # "Customer  Service " and "customer service" share one embedding, that of
+    # the first spelling seen
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Embeddings of skill strings for one model, looked up by normalized string.
+
+    Recently used vectors are kept in an in-memory LRU of at most
+    `max_memory_items` entries. Every vector ever computed is also stored under
+    `cache_dir/<model>/`: `vectors.f32` (float32 rows, memory-mapped for
+    reading), `index.txt` (the key of each row) and `meta.json` (row count, index
+    size and dimension, written last, so a crash mid-append leaves a readable store).
+    Appends hold an exclusive lock on `lock`, so several processes can fill
+    the same store. Only strings found in neither place are sent to `encode`,
+    as written, in one batch.
+
+    With precision "float16" or "int8" the vectors are unit-normalized and
+    quantized before being stored (see quantization.quantize), in memory and
+    under `cache_dir/<model>-<precision>/`, for half or a quarter of the size.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        encode: Callable[[List[str]], np.ndarray],
+        cache_dir: Optional[str] = EMBEDDINGS_DIR,
+        max_memory_items: int = 50_000,
+        precision: str = "float32",
+    ) -> None:
+        self.model_name = model_name
+        self.precision = check_precision(precision)
+        self.dtype = STORAGE_DTYPES[precision]
+        self._encode = encode
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        name = re.sub(r"[^\w.-]+", "_", model_name)
+        if precision != "float32":
+            name = f"{name}-{precision}"
+        self.path = os.path.join(cache_dir, name) if cache_dir else None
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._index_bytes = 0
+        self._vectors: Optional[np.ndarray] = None
+        if self.path:
+            self._load_index()
+
+    # --- disk store ---
+
+    def _file(self, name: str) -> str:
+        assert self.path is not None
+        return os.path.join(self.path, name)
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._file("meta.json")):
+            return
+        with open(self._file("meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self._dim = meta["dim"]
+        self._index_bytes = meta["index_bytes"]
+        with open(self._file("index.txt"), "rb") as f:
+            keys = f.read(self._index_bytes).decode("utf-8").split("\n")[:-1]
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    def _disk_vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            assert self._dim is not None
+            self._vectors = np.memmap(
+                self._file(VECTOR_FILES[self.precision]),
+                dtype=self.dtype,
+                mode="r",
+                shape=(len(self._rows), self._dim),
+            )
+        return self._vectors
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        os.makedirs(self.path or "", exist_ok=True)
+        with open(self._file("lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # other processes may have appended since the index was read:
+            # reload it and skip the keys they already stored
+            self._load_index()
+            self._vectors = None
+            new = [i for i, key in enumerate(keys) if key not in self._rows]
+            if new:
+                self._write([keys[i] for i in new], vectors[new])
+
+    def _write(self, keys: List[str], vectors: np.ndarray) -> None:
+        # called with the lock held
+        count = len(self._rows)
+        index = "".join(f"{key}\n" for key in keys).encode("utf-8")
+        # drop anything a crashed writer left past the last committed row
+        with open(self._file(VECTOR_FILES[self.precision]), "ab") as f:
+            f.truncate(count * vectors.shape[1] * vectors.itemsize)
+            f.write(vectors.tobytes())
+        with open(self._file("index.txt"), "ab") as f:
+            f.truncate(self._index_bytes)
+            f.write(index)
+
+        tmp_path = self._file(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "model": self.model_name,
+                    "precision": self.precision,
+                    "dim": int(vectors.shape[1]),
+                    "count": count + len(keys),
+                    "index_bytes": self._index_bytes + len(index),
+                },
+                f,
+            )
+        os.replace(tmp_path, self._file("meta.json"))
+
+        self._dim = int(vectors.shape[1])
+        self._index_bytes += len(index)
+        self._rows.update({key: count + i for i, key in enumerate(keys)})
+
+    # --- lookup ---
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(set(self._rows) | set(self._memory))
+
+    def __contains__(self, text: str) -> bool:
+        key = normalize_key(text)
+        return key in self._memory or key in self._rows
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Matrix of `self.dtype` with one embedding per text, in order."""
+        keys = [normalize_key(t) for t in texts]
+        # the first text given for each key is the one encoded
+        originals = dict(zip(reversed(keys), reversed(texts)))
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            elif key in self._rows:
+                found[key] = np.array(self._disk_vectors()[self._rows[key]])
+            else:
+                missing.append(key)
+
+        if missing:
+            vectors = np.asarray(
+                self._encode([originals[key] for key in missing]), dtype=np.float32
+            )
+            if self.precision != "float32":
+                vectors = quantize(vectors, self.precision)
+            if self.path:
+                self._append(missing, vectors)
+            found.update(zip(missing, vectors))
+
+        for key, vector in found.items():
+            self._remember(key, vector)
+
+        if not keys:
+            return np.empty((0, self._dim or 0), dtype=self.dtype)
+        return np.stack([found[key] for key in keys])
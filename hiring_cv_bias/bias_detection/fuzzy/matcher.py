@@ -1,12 +1,71 @@
-from typing import Set
+import copy
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set
 
-import torch
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+import polars as pl
+
+from hiring_cv_bias.bias_detection.fuzzy.embedding_cache import (
+    EMBEDDINGS_DIR,
+    EmbeddingCache,
+)
+from hiring_cv_bias.bias_detection.fuzzy.quantization import (
+    as_operand,
+    similarity_scale,
+)
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import Conf
+
+
+class BestSimilarities(NamedTuple):
+    custom: List[str]
+    custom_best: np.ndarray  # best similarity of each custom skill
+    parser: List[str]
+    parser_best: np.ndarray  # best similarity of each parser skill
 
 
 class SemanticMatcher:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2") -> None:
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache_dir: Optional[str] = EMBEDDINGS_DIR,
+        max_memory_items: int = 50_000,
+        precision: str = "float32",
+        model: Optional[Any] = None,
+    ) -> None:
+        # model: anything with SentenceTransformer's encode(texts,
+        # convert_to_numpy=True), loaded from model_name if not given
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.model = model
+        self._set_precision(precision)
+
+    def _set_precision(self, precision: str) -> None:
+        # skills are encoded once per (model, normalized string), across runs
+        # too unless cache_dir is None; "float16" and "int8" store quantized
+        # unit vectors
+        self.precision = precision
+        self.embeddings = EmbeddingCache(
+            self.model_name,
+            self._encode,
+            cache_dir=self.cache_dir,
+            max_memory_items=self.max_memory_items,
+            precision=precision,
+        )
+
+    def with_precision(self, precision: str) -> "SemanticMatcher":
+        """The same matcher, sharing the loaded model, at another precision."""
+        if precision == self.precision:
+            return self
+        matcher = copy.copy(self)
+        matcher._set_precision(precision)
+        return matcher
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, convert_to_numpy=True)
 
     def semantic_comparison(
         self,
@@ -14,37 +73,240 @@ class SemanticMatcher:
         parser_skills: Set[str],
         threshold: float = 0.5,
     ) -> Set[str]:
-        if len(custom_skills) != 0 and len(parser_skills) != 0:
-            custom_skills_list = list(custom_skills)
-            parser_skills_list = list(parser_skills)
+        return self.semantic_comparison_batch(
+            [custom_skills], [parser_skills], threshold
+        )[0]
+
+    def best_similarities(
+        self,
+        custom_skills: Sequence[Set[str]],
+        parser_skills: Sequence[Set[str]],
+        batch_size: int = 512,
+    ) -> List[Optional[BestSimilarities]]:
+        """
+        For each candidate with both sets non-empty: every custom skill's best
+        cosine similarity with a parser skill, and vice versa (None otherwise).
+
+        Each distinct skill string is embedded once for the whole corpus.
+        Candidates are then processed in blocks of similar set sizes: their
+        skill embeddings are gathered into zero-padded (block, n, dim) arrays,
+        and a single batched matmul gives every candidate's similarity matrix.
+        Padding is masked out before taking the maxima. At reduced precision
+        the vocabulary stays quantized and the int8 similarities are integer
+        dot products rescaled by 1 / 127 ** 2.
+        """
+        results: List[Optional[BestSimilarities]] = [None] * len(custom_skills)
+        pairs = [
+            (i, list(custom), list(parser))
+            for i, (custom, parser) in enumerate(zip(custom_skills, parser_skills))
+            if len(custom) != 0 and len(parser) != 0
+        ]
+        if not pairs:
+            return results
+
+        vocab = {s: k for k, s in enumerate({s for _, c, p in pairs for s in c + p})}
+        embeddings = self.embeddings.encode(list(vocab))
+        if self.precision == "float32":
+            # unit vectors, as in util.cos_sim; quantized ones already are
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        # row 0 is the zero vector used for padding
+        padded = np.vstack(
+            [np.zeros((1, embeddings.shape[1]), embeddings.dtype), embeddings]
+        )
+        scale = similarity_scale(self.precision)
+
+        pairs.sort(key=lambda pair: (len(pair[1]), len(pair[2])))
+        for b in range(0, len(pairs), batch_size):
+            block = pairs[b : b + batch_size]
+            n_custom = max(len(c) for _, c, _ in block)
+            n_parser = max(len(p) for _, _, p in block)
+
+            custom_idx = np.zeros((len(block), n_custom), dtype=np.int64)
+            parser_idx = np.zeros((len(block), n_parser), dtype=np.int64)
+            for row, (_, custom, parser) in enumerate(block):
+                custom_idx[row, : len(custom)] = [vocab[s] + 1 for s in custom]
+                parser_idx[row, : len(parser)] = [vocab[s] + 1 for s in parser]
 
-            custom_embeddings = self.model.encode(
-                custom_skills_list,
-                convert_to_tensor=True,
+            similarities = np.matmul(
+                as_operand(padded[custom_idx]),
+                as_operand(padded[parser_idx]).transpose(0, 2, 1),
             )
+            if scale != 1.0:
+                similarities *= scale
+            valid = (custom_idx > 0)[:, :, None] & (parser_idx > 0)[:, None, :]
+            similarities = np.where(valid, similarities, -np.inf)
+            custom_best = similarities.max(axis=2)
+            parser_best = similarities.max(axis=1)
 
-            parser_embeddings = self.model.encode(
-                parser_skills_list,
-                convert_to_tensor=True,
+            for row, (i, custom, parser) in enumerate(block):
+                results[i] = BestSimilarities(
+                    custom,
+                    custom_best[row, : len(custom)],
+                    parser,
+                    parser_best[row, : len(parser)],
+                )
+
+        return results
+
+    def semantic_comparison_sweep(
+        self,
+        custom_skills: Sequence[Set[str]],
+        parser_skills: Sequence[Set[str]],
+        thresholds: Sequence[float],
+        batch_size: int = 512,
+    ) -> Dict[float, List[Set[str]]]:
+        """`semantic_comparison_batch` at every threshold, from one similarity pass."""
+        best = self.best_similarities(custom_skills, parser_skills, batch_size)
+        sweep: Dict[float, List[Set[str]]] = {}
+        for threshold in thresholds:
+            results = []
+            for custom_set, sims in zip(custom_skills, best):
+                if sims is None:
+                    results.append(set(custom_set))
+                    continue
+                custom_matches = {
+                    s for s, v in zip(sims.custom, sims.custom_best) if v >= threshold
+                }
+                parser_matches = {
+                    s for s, v in zip(sims.parser, sims.parser_best) if v >= threshold
+                }
+                results.append((set(custom_set) - custom_matches) | parser_matches)
+            sweep[threshold] = results
+        return sweep
+
+    def semantic_comparison_batch(
+        self,
+        custom_skills: Sequence[Set[str]],
+        parser_skills: Sequence[Set[str]],
+        threshold: float = 0.5,
+        batch_size: int = 512,
+    ) -> List[Set[str]]:
+        """`semantic_comparison` for every candidate at once."""
+        return self.semantic_comparison_sweep(
+            custom_skills, parser_skills, [threshold], batch_size
+        )[threshold]
+
+    def threshold_sweep(
+        self,
+        custom_skills: Sequence[Set[str]],
+        parser_skills: Sequence[Set[str]],
+        thresholds: Sequence[float],
+        batch_size: int = 512,
+    ) -> Dict[float, Conf]:
+        """
+        Corpus confusion counts, as compute_candidate_coverage reports them,
+        for every threshold from one similarity pass.
+
+        With C the custom skills, P the parser skills and Cm/Pm the ones whose
+        best similarity reaches the threshold, the adjusted set is
+        A = (C - Cm) | Pm, so |A & P| = |Pm| + |(C & P) - Cm - Pm| and
+        |A| = |C| - |Cm| + |Pm| - |(C - Cm) & Pm|. These only need the best
+        similarity vectors, compared with all thresholds at once.
+        """
+        best = self.best_similarities(custom_skills, parser_skills, batch_size)
+        return confusion_sweep(best, custom_skills, parser_skills, thresholds)
+
+    def precision_report(
+        self,
+        custom_skills: Sequence[Set[str]],
+        parser_skills: Sequence[Set[str]],
+        thresholds: Sequence[float],
+        precisions: Sequence[str] = ("float16", "int8"),
+        batch_size: int = 512,
+    ) -> pl.DataFrame:
+        """
+        How many match decisions flip at each threshold when similarities are
+        computed at reduced precision instead of float32.
+
+        A decision is "best similarity >= threshold" for one custom or parser
+        skill of one candidate, i.e. whether semantic_comparison moves it.
+        Alongside the flips, the corpus counts threshold_sweep would report
+        show how much they move precision and recall.
+        """
+        reference = self.with_precision("float32").best_similarities(
+            custom_skills, parser_skills, batch_size
+        )
+        ref_best = flat_best(reference)
+        t = np.asarray(thresholds, dtype=np.float64)[:, None]
+
+        rows = []
+        for precision in ["float32", *precisions]:
+            best = (
+                reference
+                if precision == "float32"
+                else self.with_precision(precision).best_similarities(
+                    custom_skills, parser_skills, batch_size
+                )
             )
+            values = flat_best(best)
+            flips = ((ref_best[None, :] >= t) != (values[None, :] >= t)).sum(axis=1)
+            max_error = float(np.abs(values - ref_best).max()) if values.size else 0.0
+            confs = confusion_sweep(best, custom_skills, parser_skills, thresholds)
+            for k, threshold in enumerate(thresholds):
+                rows.append(
+                    {
+                        "dtype": precision,
+                        "threshold": threshold,
+                        "decisions": values.size,
+                        "flips": int(flips[k]),
+                        "flip_rate": int(flips[k]) / values.size
+                        if values.size
+                        else 0.0,
+                        "max_abs_error": max_error,
+                        **confs[threshold].as_dict(),
+                    }
+                )
+        return pl.DataFrame(rows)
+
 
-            similarities = util.cos_sim(custom_embeddings, parser_embeddings)
+def flat_best(best: Sequence[Optional[BestSimilarities]]) -> np.ndarray:
+    # every custom then parser best similarity, in candidate order
+    parts = [
+        v
+        for sims in best
+        if sims is not None
+        for v in (sims.custom_best, sims.parser_best)
+    ]
+    return np.concatenate(parts).astype(np.float64) if parts else np.empty(0)
 
-            matches_mask = similarities >= threshold
-            custom_match_indices = torch.any(matches_mask, dim=1)
-            parser_match_indices = torch.any(matches_mask, dim=0)
 
-            custom_matches = set()
-            for i, is_matched in enumerate(custom_match_indices):
-                if is_matched:
-                    custom_matches.add(custom_skills_list[i])
+def confusion_sweep(
+    best: Sequence[Optional[BestSimilarities]],
+    custom_skills: Sequence[Set[str]],
+    parser_skills: Sequence[Set[str]],
+    thresholds: Sequence[float],
+) -> Dict[float, Conf]:
+    # see SemanticMatcher.threshold_sweep
+    n_custom = sum(len(c) for c in custom_skills)
+    n_parser = sum(len(p) for p in parser_skills)
+    tn = sum(not c and not p for c, p in zip(custom_skills, parser_skills))
 
-            parser_matches = set()
-            for j, is_matched in enumerate(parser_match_indices):
-                if is_matched:
-                    parser_matches.add(parser_skills_list[j])
+    custom_best, parser_best = [], []
+    shared_custom, shared_parser = [], []
+    offset_c = offset_p = 0
+    for sims in best:
+        if sims is None:
+            continue
+        custom_best.append(sims.custom_best)
+        parser_best.append(sims.parser_best)
+        parser_pos = {s: j for j, s in enumerate(sims.parser)}
+        for i, s in enumerate(sims.custom):
+            if s in parser_pos:
+                shared_custom.append(offset_c + i)
+                shared_parser.append(offset_p + parser_pos[s])
+        offset_c += len(sims.custom)
+        offset_p += len(sims.parser)
 
-            custom_skills = custom_skills - custom_matches
-            custom_skills.update(parser_matches)
+    t = np.asarray(thresholds, dtype=np.float64)[:, None]
+    cm = np.concatenate(custom_best or [np.empty(0)])[None, :] >= t
+    pm = np.concatenate(parser_best or [np.empty(0)])[None, :] >= t
+    cm_shared, pm_shared = cm[:, shared_custom], pm[:, shared_parser]
 
-        return custom_skills
+    n_cm, n_pm = cm.sum(axis=1), pm.sum(axis=1)
+    tp = n_pm + (~cm_shared & ~pm_shared).sum(axis=1)
+    adjusted = n_custom - n_cm + n_pm - (~cm_shared & pm_shared).sum(axis=1)
+    return {
+        threshold: Conf(int(tp[k]), int(n_parser - tp[k]), tn, int(adjusted[k] - tp[k]))
+        for k, threshold in enumerate(thresholds)
+    }
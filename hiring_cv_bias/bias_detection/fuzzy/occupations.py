@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from importlib.metadata import version
+from typing import Any, Dict, List, Tuple
+
+import marisa_trie
+import polars as pl
+
+from hiring_cv_bias.bias_detection.fuzzy.utils import normalize_job_records
+from hiring_cv_bias.bias_detection.rule_based.scanners import is_word_char
+from hiring_cv_bias.config import CACHE_DIR, JOBS_PATH
+
+DICTIONARY_VERSION = 1
+
+# label kinds stored with every record
+PREFERRED, SLASH, ALTERNATIVE = 0, 1, 2
+
+# (kind, rank, concept): rank is the label's position in the job list, concept
+# the row of its occupation in the csv
+RECORD_FORMAT = "<BII"
+Record = Tuple[int, int, int]
+
+
+def dictionary_key(jobs_path: str = JOBS_PATH) -> str:
+    with open(jobs_path, "rb") as f:
+        jobs_hash = hashlib.sha256(f.read()).hexdigest()
+    inputs = {
+        "version": DICTIONARY_VERSION,
+        "jobs": jobs_hash,
+        "marisa-trie": version("marisa-trie"),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def build_records(
+    jobs_path: str = JOBS_PATH,
+) -> Tuple[List[Tuple[str, Record]], Dict[str, Any]]:
+    df = pl.read_csv(jobs_path)
+    preferred = df["preferredLabel"].fill_null("").to_list()
+    alternative = (
+        df["altLabels"].fill_null("").to_list() if "altLabels" in df.columns else []
+    )
+
+    # preferred labels first, in the order normalize_jobs returns them
+    jobs = normalize_job_records(preferred)
+    records: List[Tuple[str, Record]] = [
+        (label, (PREFERRED if label == preferred[concept] else SLASH, rank, concept))
+        for rank, (label, concept) in enumerate(jobs)
+        if label
+    ]
+    rank = len(jobs)
+    for concept, labels in enumerate(alternative):
+        for label, _ in normalize_job_records(labels.split("\n")):
+            if label.strip():
+                records.append((label, (ALTERNATIVE, rank, concept)))
+                rank += 1
+
+    meta = {
+        "version": DICTIONARY_VERSION,
+        "source": os.path.basename(jobs_path),
+        "concepts": df["conceptUri"].to_list(),
+        "preferred": preferred,
+    }
+    return records, meta
+
+
+class OccupationDictionary:
+    """
+    ESCO occupation labels compiled into a marisa RecordTrie.
+
+    Keys are the normalized labels (see normalize_jobs): preferred labels,
+    their slash-split variants and the alternative labels. Each record holds
+    the label kind, its position in the job list and its occupation. The trie
+    is memory-mapped, so loading is instant and the pages are shared by every
+    process using the same artifact.
+    """
+
+    def __init__(self, trie: marisa_trie.RecordTrie, meta: Dict[str, Any]) -> None:
+        self.trie = trie
+        self.meta = meta
+
+    @classmethod
+    def compile(cls, jobs_path: str = JOBS_PATH, cache_dir: str = CACHE_DIR) -> str:
+        """Build the artifact for jobs_path if needed and return its path."""
+        path = os.path.join(cache_dir, f"occupations_{dictionary_key(jobs_path)[:16]}")
+        if os.path.exists(f"{path}.json"):
+            return path
+
+        records, meta = build_records(jobs_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        marisa_trie.RecordTrie(RECORD_FORMAT, records).save(tmp_path)
+        os.replace(tmp_path, f"{path}.marisa")
+        # metadata last: it marks the artifact as complete
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, f"{path}.json")
+        return path
+
+    @classmethod
+    def load(
+        cls, jobs_path: str = JOBS_PATH, cache_dir: str = CACHE_DIR
+    ) -> "OccupationDictionary":
+        path = cls.compile(jobs_path, cache_dir)
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        trie = marisa_trie.RecordTrie(RECORD_FORMAT).mmap(f"{path}.marisa")
+        return cls(trie, meta)
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.trie
+
+    def __len__(self) -> int:
+        return len(self.trie)
+
+    def jobs(self, alternative: bool = False) -> List[str]:
+        """
+        Job titles in list order: normalize_jobs of the preferred labels,
+        followed by the alternative labels when asked for.
+        """
+        kinds = {PREFERRED, SLASH, ALTERNATIVE} if alternative else {PREFERRED, SLASH}
+        ranked = [
+            (rank, label)
+            for label, (kind, rank, _) in self.trie.items()
+            if kind in kinds
+        ]
+        return [label for _, label in sorted(ranked)]
+
+    def occupations(self, label: str) -> List[str]:
+        """Preferred labels of the occupations a label belongs to."""
+        preferred = self.meta["preferred"]
+        return sorted(
+            {preferred[concept] for _, _, concept in self.trie.get(label, [])}
+        )
+
+    def concept_uris(self, label: str) -> List[str]:
+        concepts = self.meta["concepts"]
+        return sorted({concepts[concept] for _, _, concept in self.trie.get(label, [])})
+
+    def prefixes(self, text: str) -> List[str]:
+        """Labels that text starts with, ending on a word boundary."""
+        return [
+            label
+            for label in self.trie.prefixes(text)
+            if len(label) == len(text) or not is_word_char(text[len(label)])
+        ]
+
+
+@lru_cache(maxsize=None)
+def occupation_dictionary(
+    jobs_path: str = JOBS_PATH, cache_dir: str = CACHE_DIR
+) -> OccupationDictionary:
+    return OccupationDictionary.load(jobs_path, cache_dir)
@@ -1,12 +1,31 @@
-from typing import Any, Dict, List, Set
+from typing import List, Optional, Set, Tuple, Type
 
 import nltk
 import polars as pl
 import spacy
 from nltk.corpus import stopwords
 from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
 from tqdm.notebook import tqdm
 
+from hiring_cv_bias.bias_detection.fuzzy.occupations import (
+    OccupationDictionary,
+    occupation_dictionary,
+)
+
+# PhraseMatcher(attr="LOWER") only looks at tokens: skip loading every
+# trained component of the pipeline
+SPACY_MODEL = "en_core_web_sm"
+TOKENIZER_ONLY = [
+    "tok2vec",
+    "tagger",
+    "parser",
+    "senter",
+    "attribute_ruler",
+    "lemmatizer",
+    "ner",
+]
+
 
 class JobParser:
     def __init__(
@@ -16,36 +35,48 @@ class JobParser:
         nltk.download("stopwords", quiet=True)
         self.stopwords = stopwords.words("english")
         self.job_list = job_list
-        self.spacy_model = spacy.load("en_core_web_sm")
+        self.spacy_model = spacy.load(SPACY_MODEL, exclude=TOKENIZER_ONLY)
         self.phrase_matcher = PhraseMatcher(self.spacy_model.vocab, attr="LOWER")
         patterns = [self.spacy_model.make_doc(job) for job in self.job_list]
         self.phrase_matcher.add("Jobs", patterns)
 
-    def parse_with_n_grams(self, text: str) -> Set[str]:
-        jobs_found = set()
-
-        doc = self.spacy_model(text)
-
-        match = self.phrase_matcher(doc)
+    @classmethod
+    def from_dictionary(
+        cls,
+        dictionary: Optional[OccupationDictionary] = None,
+        alternative: bool = False,
+    ) -> "JobParser":
+        # the job list of patterns.jobs_pattern, plus the ESCO alternative
+        # labels when asked for
+        dictionary = dictionary or occupation_dictionary()
+        return cls(dictionary.jobs(alternative))
 
-        if len(match) > 0:
-            for _, start, end in match:
-                jobs_found.add(doc[start:end].text)
+    def __reduce__(self) -> Tuple[Type["JobParser"], Tuple[List[str]]]:
+        # worker processes rebuild the parser from the job list instead of
+        # receiving a pickled spaCy pipeline
+        return (JobParser, (self.job_list,))
 
-        return jobs_found
+    def jobs_in_doc(self, doc: Doc) -> Set[str]:
+        return {doc[start:end].text for _, start, end in self.phrase_matcher(doc)}
 
-    def parse_df(self, df: pl.DataFrame) -> pl.DataFrame:
-        jobs_data: Dict[str, List[Any]] = {"CANDIDATE_ID": [], "Job_Title": []}
-        for row in tqdm(
-            df.iter_rows(named=True), total=df.height, desc="Job parsing..."
-        ):
-            cv = row["Translated_CV"]
-            jobs = self.parse_with_n_grams(cv)
-            if len(jobs) > 0:
-                jobs_data["Job_Title"].extend(jobs)
-                jobs_data["CANDIDATE_ID"].extend([row["CANDIDATE_ID"]] * len(jobs))
-            else:
-                jobs_data["Job_Title"].append(None)
-                jobs_data["CANDIDATE_ID"].append(row["CANDIDATE_ID"])
+    def parse_with_n_grams(self, text: str) -> Set[str]:
+        return self.jobs_in_doc(self.spacy_model(text))
 
-        return pl.DataFrame(jobs_data)
+    def parse_df(
+        self, df: pl.DataFrame, batch_size: int = 256, n_process: int = 1
+    ) -> pl.DataFrame:
+        # one row per (candidate, job title), or a null title when none is found
+        docs = self.spacy_model.pipe(
+            df["Translated_CV"].fill_null(""),
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        jobs = pl.Series(
+            "Job_Title",
+            (
+                list(self.jobs_in_doc(doc))
+                for doc in tqdm(docs, total=df.height, desc="Job parsing...")
+            ),
+            dtype=pl.List(pl.String),
+        )
+        return df.select("CANDIDATE_ID").with_columns(jobs).explode("Job_Title")
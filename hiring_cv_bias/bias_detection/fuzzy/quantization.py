@@ -0,0 +1,42 @@
+import numpy as np
+
+from hiring_cv_bias.bias_detection.fuzzy.ann import unit_rows
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# int8 components are round(127 * x) of a unit vector x
+INT8_SCALE = 127
+
+STORAGE_DTYPES = {
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    return precision
+
+
+def quantize(vectors: np.ndarray, precision: str) -> np.ndarray:
+    """Unit-normalized rows, stored as float16 or symmetric int8."""
+    unit = unit_rows(vectors)
+    if check_precision(precision) == "int8":
+        return np.clip(np.rint(unit * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(
+            np.int8
+        )
+    return unit.astype(STORAGE_DTYPES[precision])
+
+
+def similarity_scale(precision: str) -> float:
+    # dot products of int8 rows are in units of INT8_SCALE ** 2
+    return 1 / INT8_SCALE**2 if check_precision(precision) == "int8" else 1.0
+
+
+def as_operand(vectors: np.ndarray) -> np.ndarray:
+    # numpy has no fast float16/int8 matmul, so blocks are widened to float32
+    # right before the product. Integer dot products stay exact: every partial
+    # sum is bounded by dim * 127 ** 2, below 2 ** 24 for dim <= 1040.
+    return vectors.astype(np.float32, copy=False)
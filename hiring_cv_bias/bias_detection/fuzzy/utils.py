@@ -1,13 +1,21 @@
-from typing import List
+from typing import List, Tuple
+
+
+def normalize_job_records(jobs: List[str]) -> List[Tuple[str, int]]:
+    # titles longer than three words are dropped and "a/b" titles are replaced by
+    # "a" and "b", appended after the others; each title keeps its source index
+    kept: List[Tuple[str, int]] = []
+    split: List[Tuple[str, int]] = []
+    for i, job in enumerate(jobs):
+        if len(job.split()) > 3:
+            continue
+        if "/" in job:
+            split.extend((part, i) for part in job.split("/"))
+        else:
+            kept.append((job, i))
+    return kept + split
 
 
 def normalize_jobs(jobs: List[str]) -> List[str]:
-    for job in jobs.copy():
-        words = job.split()
-        if len(words) > 3:
-            jobs.remove(job)
-        elif "/" in job:
-            first_job, second_job = job.split("/")
-            jobs.remove(job)
-            jobs.extend([first_job, second_job])
+    jobs[:] = [job for job, _ in normalize_job_records(jobs)]
     return jobs
@@ -1,15 +1,18 @@
-import re
 from collections import defaultdict
-from typing import Callable, Dict, List, Pattern, Tuple, TypedDict
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple, TypedDict
 
 import polars as pl
 import streamlit as st
 
-from hiring_cv_bias.bias_detection.rule_based.extractors import LANGUAGE_REGEXES_EN
-from hiring_cv_bias.bias_detection.rule_based.patterns import (
-    driver_license_pattern_eng,
-    jobs_pattern,
-    languages_pattern_eng,
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import SPANS_COLUMN
+from hiring_cv_bias.bias_detection.rule_based.extractors import (
+    SpanExtractor,
+    driver_license_spans,
+    extract_spans,
+    job_title_spans,
+    language_spans,
+    non_overlapping,
+    spans_from_json,
 )
 from hiring_cv_bias.config import (
     CLEANED_SKILLS,
@@ -22,7 +25,9 @@ from hiring_cv_bias.utils import load_data
 
 class CategoryConf(TypedDict):
     fn_path: str
-    regex: Pattern[str]
+    spans: SpanExtractor
+    # which spans to highlight for a row: all of them, or only the missed skill
+    span_pred: Callable[[Mapping, str], bool]
     tag_pred: Callable[[str], bool]
     title: str
 
@@ -30,19 +35,22 @@ class CategoryConf(TypedDict):
 CATEGORIES: Dict[str, CategoryConf] = {
     "Driver License": {
         "fn_path": DRIVING_LICENSE_FALSE_NEGATIVES_PATH,
-        "regex": driver_license_pattern_eng,
+        "spans": driver_license_spans,
+        "span_pred": lambda span, skill: True,
         "tag_pred": lambda t: t == "DRIVERLICENSE",
         "title": "Driving-License — False Negative Explorer",
     },
     "Language Skill": {
         "fn_path": LANGUAGE_SKILL_FALSE_NEGATIVES_PATH,
-        "regex": languages_pattern_eng,
+        "spans": language_spans,
+        "span_pred": lambda span, skill: span["label"] == skill,
         "tag_pred": lambda t: t == "Language_Skill",
         "title": "Language-Skill — False Negative Explorer",
     },
     "Job Title": {
         "fn_path": JOB_TITLE_FALSE_NEGATIVES_PATH,
-        "regex": jobs_pattern,
+        "spans": job_title_spans,
+        "span_pred": lambda span, skill: span["label"] == skill,
         "tag_pred": lambda t: t == "Job_title",
         "title": "Job-title — False Negative Explorer",
     },
@@ -58,10 +66,17 @@ if st.session_state.get("current_cat") != choice:
 
 # ────────────────────────────────────────────────────────────────
 @st.cache_data(show_spinner="Loading raw false-negatives…")
-def load_fn_raw(path: str) -> pl.DataFrame:
-    return pl.read_csv(
-        path, separator=";", columns=["CANDIDATE_ID", "cv_text", "skill"]
-    ).with_columns(pl.col("CANDIDATE_ID").cast(pl.Utf8))
+def load_fn_raw(path: str, category: str) -> pl.DataFrame:
+    df = pl.read_csv(path, separator=";").with_columns(
+        pl.col("CANDIDATE_ID").cast(pl.Utf8)
+    )
+    columns = ["CANDIDATE_ID", "cv_text", "skill"]
+    if SPANS_COLUMN in df.columns:
+        # saved by the bias detection notebook with each false negative
+        return df.select(*columns, spans_from_json(SPANS_COLUMN))
+    # older files: find the matches once, for the whole file
+    spans = extract_spans(df["cv_text"], {SPANS_COLUMN: CATEGORIES[category]["spans"]})
+    return df.select(columns).hstack(spans)
 
 
 @st.cache_data(show_spinner="Loading parser skills…")
@@ -73,21 +88,34 @@ def load_skills(path: str = CLEANED_SKILLS) -> Dict[str, List[Tuple[str, str]]]:
     return d
 
 
-def make_snippet(text: str, rx: Pattern[str]) -> str:
-    m = rx.search(text)
-    if not m:
+def mark(text: str, spans: Sequence[Tuple[int, int]], offset: int = 0) -> str:
+    parts = []
+    pos = 0
+    for start, end in spans:
+        start, end = start - offset, end - offset
+        if start < pos or end > len(text):
+            continue
+        parts.append(text[pos:start])
+        parts.append(
+            f"<span style='color:red;font-weight:bold'>{text[start:end]}</span>"
+        )
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def make_snippet(text: str, spans: Sequence[Tuple[int, int]]) -> str:
+    if not spans:
         return text[:240] + "…"
-    start, end = max(0, m.start() - 120), min(len(text), m.end() + 120)
-    snippet = text[start:end]
-    snippet = rx.sub(
-        lambda mo: f"<span style='color:red;font-weight:bold'>{mo.group(0)}</span>",
-        snippet,
-    )
+    first_start, first_end = spans[0]
+    start, end = max(0, first_start - 120), min(len(text), first_end + 120)
+    inside = [(s, e) for s, e in spans if s >= start and e <= end]
+    snippet = mark(text[start:end], inside, offset=start)
     return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
 
 
 # ────────────────────────────────────────────────────────────────
-df_fn_raw = load_fn_raw(CFG["fn_path"])
+df_fn_raw = load_fn_raw(CFG["fn_path"], choice)
 skills_full = load_skills()
 
 # ────────────────────────────────────────────────────────────────
@@ -119,16 +147,6 @@ if search:
         )
 
 
-# ────────────────────────────────────────────────────────────────
-@st.cache_data(show_spinner="Generating snippets…")
-def annotate(text: str, rx: Pattern[str]) -> str:
-    highlighted_text = rx.sub(
-        lambda mo: f"<span style='color:red;font-weight:bold'>{mo.group(0)}</span>",
-        text,
-    )
-    return highlighted_text
-
-
 ids = set(sample_df["CANDIDATE_ID"].to_list())
 skills_by_id = {cid: skills_full.get(cid, []) for cid in ids}
 
@@ -142,17 +160,13 @@ else:
     for row in sample_df.to_dicts():
         cid = row["CANDIDATE_ID"]
 
-        if choice == "Driver License":
-            regex = CFG["regex"]
-        elif choice == "Language Skill":
-            regex = LANGUAGE_REGEXES_EN[row["skill"]]
-        elif choice == "Job Title":
-            regex = re.compile(rf"\b{row['skill']}\b")
-
+        spans = non_overlapping(
+            span for span in row[SPANS_COLUMN] if CFG["span_pred"](span, row["skill"])
+        )
         html = (
-            annotate(row["cv_text"], regex)
+            mark(row["cv_text"], spans)
             if show_full
-            else annotate(make_snippet(row["cv_text"], regex), regex)
+            else make_snippet(row["cv_text"], spans)
         )
 
         col_cv, col_sk = st.columns([3, 2], gap="large")
@@ -1,6 +1,6 @@
 import polars as pl
 
-from .extractors import extract_driver_license
+from .extractors import driver_license_expr
 
 
 def add_demographic_info(
@@ -12,12 +12,6 @@ def add_demographic_info(
         candidates_df.select(["CANDIDATE_ID", "Gender", "Location"]),
         on="CANDIDATE_ID",
         how="inner",
-    ).with_columns(
-        pl.col("Translated_CV")
-        .map_elements(
-            lambda t: bool(extract_driver_license(t)), return_dtype=pl.Boolean
-        )
-        .alias("has_driving_license")
-    )
+    ).with_columns(driver_license_expr("Translated_CV").alias("has_driving_license"))
 
     return enriched_cv_df
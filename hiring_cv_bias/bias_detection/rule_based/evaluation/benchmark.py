@@ -0,0 +1,229 @@
+import os
+import random
+import re
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Set
+
+import polars as pl
+
+from hiring_cv_bias.bias_detection.rule_based import patterns
+from hiring_cv_bias.bias_detection.rule_based.extractors import (
+    driver_license_expr,
+    extract_driver_license,
+    extract_languages,
+    extract_languages_regex,
+    norm_driver_license,
+    norm_driver_license_expr,
+)
+from hiring_cv_bias.bias_detection.rule_based.parser import (
+    has_driver_license,
+    has_driver_license_expr,
+)
+from hiring_cv_bias.bias_detection.rule_based.scanners import JobTitleMatcher
+from hiring_cv_bias.parallel import parallel_map
+
+FILLER_WORDS = [
+    "experience",
+    "worked",
+    "company",
+    "responsible",
+    "for",
+    "the",
+    "management",
+    "of",
+    "customers",
+    "and",
+    "suppliers",
+    "in",
+    "warehouse",
+    "office",
+    "milan",
+    "rome",
+    "2019",
+    "-",
+    "present",
+    "skills:",
+    "team",
+    "work,",
+    "orders.",
+]
+
+
+DRIVER_LICENSE_PHRASES = [
+    "driving license B",
+    "Driver's licence: AM",
+    "car license",
+    "license: b",
+    "licensed driver",
+    "B driving license",
+    "own car",
+    "drivers license",
+    "license CE",
+    "category license c1",
+]
+
+LANGUAGE_PHRASES = [
+    "native speaker of italian",
+    "english B2",
+    "knowledge of the french language",
+    "spanish spoken and written",
+    "languages german",
+    "proficiency in portuguese",
+    "certification in russian",
+    "romanian C1",
+    "arabic",
+    "chinese",
+]
+
+
+def make_synthetic_cvs(
+    n: int,
+    phrases: Sequence[str],
+    words_per_cv: int = 400,
+    phrases_per_cv: int = 5,
+    seed: int = 0,
+) -> List[str]:
+    # filler text with a few target phrases sprinkled in
+    rng = random.Random(seed)
+    cvs = []
+    for _ in range(n):
+        words = rng.choices(FILLER_WORDS, k=words_per_cv)
+        for phrase in rng.sample(list(phrases), k=min(phrases_per_cv, len(phrases))):
+            words.insert(rng.randrange(len(words) + 1), phrase)
+        cvs.append(" ".join(words))
+    return cvs
+
+
+def measure_throughput(fn: Callable[[str], object], texts: Iterable[str]) -> float:
+    texts = list(texts)
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed if elapsed else float("inf")
+
+
+def benchmark_jobs_matcher(texts: Sequence[str], jobs: Sequence[str]) -> pl.DataFrame:
+    start = time.perf_counter()
+    regex = re.compile("|".join(rf"\b{job}\b" for job in jobs))
+    regex_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = JobTitleMatcher(jobs)
+    matcher_build = time.perf_counter() - start
+
+    same = sum(
+        [(m.group(0), *m.span()) for m in regex.finditer(text)]
+        == [(text[s:e], s, e) for _, s, e in matcher.spans(text)]
+        for text in texts
+    )
+    print(f"Identical matches on {same} / {len(texts)} CVs")
+
+    return pl.DataFrame(
+        {
+            "method": ["regex alternation", "aho-corasick"],
+            "build_s": [regex_build, matcher_build],
+            "cvs_per_s": [
+                measure_throughput(regex.findall, texts),
+                measure_throughput(matcher.findall, texts),
+            ],
+        }
+    )
+
+
+def benchmark_language_scanner(texts: Sequence[str]) -> pl.DataFrame:
+    same = sum(extract_languages_regex(t) == extract_languages(t) for t in texts)
+    print(f"Identical languages on {same} / {len(texts)} CVs")
+
+    return pl.DataFrame(
+        {
+            "method": ["regex per language", "single-pass scanner"],
+            "cvs_per_s": [
+                measure_throughput(extract_languages_regex, texts),
+                measure_throughput(extract_languages, texts),
+            ],
+        }
+    )
+
+
+def driver_license_parity(texts: pl.Series) -> pl.DataFrame:
+    """Rows where a Python regex and its native Polars translation disagree."""
+    df = pl.DataFrame({"text": texts}).with_columns(
+        pl.col("text")
+        .map_elements(
+            lambda t: bool(extract_driver_license(t)), return_dtype=pl.Boolean
+        )
+        .alias("extract_python"),
+        driver_license_expr("text").alias("extract_native"),
+        pl.col("text")
+        .map_elements(has_driver_license, return_dtype=pl.Boolean)
+        .alias("has_python"),
+        has_driver_license_expr("text").alias("has_native"),
+        pl.col("text")
+        .map_elements(norm_driver_license, return_dtype=pl.String)
+        .alias("norm_python"),
+        norm_driver_license_expr("text").alias("norm_native"),
+    )
+    return df.filter(
+        (pl.col("extract_python") != pl.col("extract_native"))
+        | (pl.col("has_python") != pl.col("has_native"))
+        | (pl.col("norm_python") != pl.col("norm_native"))
+    )
+
+
+def benchmark_driver_license(texts: pl.Series) -> pl.DataFrame:
+    mismatches = driver_license_parity(texts)
+    print(f"Identical hits on {len(texts) - mismatches.height} / {len(texts)} CVs")
+
+    df = pl.DataFrame({"text": texts})
+    python = pl.col("text").map_elements(
+        lambda t: bool(extract_driver_license(t)), return_dtype=pl.Boolean
+    )
+    timings = []
+    for expr in (python, driver_license_expr("text")):
+        start = time.perf_counter()
+        df.select(expr)
+        timings.append(len(texts) / (time.perf_counter() - start))
+
+    return pl.DataFrame(
+        {"method": ["map_elements", "native expression"], "cvs_per_s": timings}
+    )
+
+
+def worker_counts(max_workers: Optional[int] = None) -> List[int]:
+    # 1, 2, 4, ... up to max_workers (every core by default), and max_workers
+    max_workers = max_workers or os.cpu_count() or 1
+    doubling = [2**k for k in range(max_workers.bit_length())]
+    return sorted({*doubling, max_workers} - {0})
+
+
+def benchmark_parallel_extraction(
+    texts: Sequence[str],
+    extractor: Callable[[str], Set[str]] = extract_languages,
+    workers: Optional[Sequence[int]] = None,
+    chunk_size: int = 256,
+) -> pl.DataFrame:
+    # scaling of parallel_map over the given worker counts, worker_counts() by
+    # default; the first one is the baseline of the speedup column
+    workers = workers or worker_counts()
+    reference = [extractor(t) for t in texts]
+    rows = []
+    for n in workers:
+        start = time.perf_counter()
+        found = parallel_map(
+            extractor,
+            texts,
+            n_workers=n,
+            chunk_size=chunk_size,
+            initializer=patterns.warm_extractors,
+        )
+        elapsed = time.perf_counter() - start
+        if found != reference:
+            raise RuntimeError(f"n_workers={n} changed the results")
+        rows.append(
+            {"n_workers": n, "seconds": elapsed, "cvs_per_s": len(texts) / elapsed}
+        )
+
+    return pl.DataFrame(rows).with_columns(
+        (pl.col("cvs_per_s") / pl.col("cvs_per_s").first()).alias("speedup")
+    )
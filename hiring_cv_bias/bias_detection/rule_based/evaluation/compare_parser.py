@@ -1,127 +1,265 @@
-from typing import Any, Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Sequence, Set
 
 import polars as pl
-from tqdm.notebook import tqdm
 
-from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import Conf, Result
+from hiring_cv_bias.bias_detection.rule_based import patterns
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import (
+    ROW,
+    SPANS_COLUMN,
+    Conf,
+    Result,
+)
+from hiring_cv_bias.bias_detection.rule_based.extractors import (
+    SpanExtractor,
+    extract_spans,
+    span_labels,
+)
+from hiring_cv_bias.parallel import parallel_map
+
+SKILLS = pl.List(pl.String)
+
+
+def group_parser_skills(
+    df_parser: pl.DataFrame,
+    skill_type: str,
+    norm: Callable[[str], str] = str.lower,
+) -> pl.DataFrame:
+    skills = df_parser.filter(
+        (pl.col("Skill_Type") == skill_type) & pl.col("Skill").is_not_null()
+    ).select("CANDIDATE_ID", "Skill")
+
+    # normalize every distinct raw skill only once
+    raw = skills["Skill"].unique()
+    normalized = pl.DataFrame(
+        {"Skill": raw, "parser": pl.Series([norm(s) for s in raw], dtype=pl.String)}
+    )
+
+    return (
+        skills.join(normalized, on="Skill", how="inner")
+        .group_by("CANDIDATE_ID")
+        .agg(pl.col("parser").unique())
+    )
+
+
+def extract_skills(
+    texts: pl.Series,
+    extractor: Optional[Callable[[str], Set[str]]] = None,
+    n_workers: int = 1,
+    chunk_size: int = 256,
+    span_extractor: Optional[SpanExtractor] = None,
+) -> pl.DataFrame:
+    """
+    The skills found in each text ("truth") and, with span_extractor, where
+    they are (SPANS_COLUMN). Without extractor the skills are the span labels,
+    so every text is scanned once; with both, extractor decides the skills
+    and the spans are only kept for highlighting.
+    """
+    if extractor is None and span_extractor is None:
+        raise ValueError("Pass an extractor, a span_extractor or both")
+
+    columns = []
+    if span_extractor is not None:
+        spans = extract_spans(
+            texts, {SPANS_COLUMN: span_extractor}, n_workers, chunk_size
+        )[SPANS_COLUMN]
+        columns.append(spans)
+    if extractor is None:
+        labels = span_labels(SPANS_COLUMN).cast(SKILLS).alias("truth")
+        columns.append(spans.to_frame().select(labels).to_series())
+    else:
+        found = parallel_map(
+            extractor,
+            texts,
+            n_workers=n_workers,
+            chunk_size=chunk_size,
+            initializer=patterns.warm_extractors,
+        )
+        columns.append(
+            pl.Series("truth", [list(skills) for skills in found], dtype=SKILLS)
+        )
+    return pl.DataFrame(columns)
+
+
+def candidate_skill_lists(
+    df_cv: pl.DataFrame,
+    df_parser: pl.DataFrame,
+    skill_type: str,
+    extractor: Optional[Callable[[str], Set[str]]] = None,
+    norm: Callable[[str], str] = str.lower,
+    n_workers: int = 1,
+    chunk_size: int = 256,
+    span_extractor: Optional[SpanExtractor] = None,
+) -> pl.DataFrame:
+    # ROW numbers the CVs, as a candidate can have more than one
+    found = extract_skills(
+        df_cv["Translated_CV"], extractor, n_workers, chunk_size, span_extractor
+    )
+    return (
+        df_cv.hstack(found)
+        .with_row_index(ROW)
+        .join(
+            group_parser_skills(df_parser, skill_type, norm),
+            on="CANDIDATE_ID",
+            how="left",
+        )
+        .with_columns(pl.col("parser").fill_null(pl.lit([], dtype=SKILLS)))
+    )
 
 
 def collect_confusion_rows(
-    rows: List[Dict[str, Any]],
-    base_row: Dict[str, Any],
-    keys: List[str],
-    skills: Set[Optional[str]],
+    df: pl.DataFrame,
+    skills_col: Optional[str],
     reason: str,
-) -> None:
-    base = {k: base_row[k] for k in keys}
-    for s in skills:
-        entry = dict(base)
-        entry["skill"] = s
-        entry["cv_text"] = base_row["Translated_CV"]
-        entry["cv_italian"] = base_row["CV_text_anon"]
-        entry["reason"] = reason
-        rows.append(entry)
+) -> pl.DataFrame:
+    # one row per skill, or a single skill-less row when skills_col is None
+    skill = pl.lit(None, dtype=pl.String)
+    if skills_col is not None:
+        df = df.explode(skills_col).filter(pl.col(skills_col).is_not_null())
+        skill = pl.col(skills_col)
+
+    return df.select(
+        "CANDIDATE_ID",
+        ROW,
+        skill.alias("skill"),
+        pl.lit(reason).alias("reason"),
+    )
 
 
 def compute_candidate_coverage(
     df_cv: pl.DataFrame,
     df_parser: pl.DataFrame,
     skill_type: str,
-    extractor: Callable[[str], Set[str]],
+    extractor: Optional[Callable[[str], Set[str]]] = None,
     norm: Callable[[str], str] = str.lower,
     matcher: Optional[Callable[[Set[str], Set[str]], Set[str]]] = None,
     verbose: bool = True,
+    n_workers: int = 1,
+    chunk_size: int = 256,
+    batch_matcher: Optional[
+        Callable[[List[Set[str]], List[Set[str]]], List[Set[str]]]
+    ] = None,
+    span_extractor: Optional[SpanExtractor] = None,
 ) -> Result:
-    tp = fp = tn = fn = 0
-    tp_rows: List[Dict] = []
-    fp_rows: List[Dict] = []
-    fn_rows: List[Dict] = []
-    tn_rows: List[Dict] = []
-    truth_ids, parser_ids = set(), set()
-
-    features = ["CANDIDATE_ID", "Gender", "Location", "length"]
+    df = candidate_skill_lists(
+        df_cv,
+        df_parser,
+        skill_type,
+        extractor,
+        norm,
+        n_workers,
+        chunk_size,
+        span_extractor,
+    )
+    has_truth = pl.col("truth").list.len() > 0
+    has_parser = pl.col("parser").list.len() > 0
 
-    for row in tqdm(df_cv.iter_rows(named=True), total=df_cv.height):
-        cid, raw = row["CANDIDATE_ID"], row["Translated_CV"]
+    if verbose:
+        n = df.select(
+            has_truth.sum().alias("truth"),
+            has_parser.sum().alias("parser"),
+            (has_truth & has_parser).sum().alias("both"),
+            (has_truth & ~has_parser).sum().alias("only_truth"),
+            (~has_truth & has_parser).sum().alias("only_parser"),
+        ).row(0, named=True)
+        print(f"Regex positive candidates        : {n['truth']}")
+        print(f"Parser positive candidates: {n['parser']}")
+        print(f"- Both regex & parser   : {n['both']}")
+        print(f"- Only regex            : {n['only_truth']}")
+        print(f"- Only parser           : {n['only_parser']}\n")
 
-        truth = extractor(raw)
-        if truth:
-            truth_ids.add(cid)
+    matched: Optional[List[Set[str]]] = None
+    if batch_matcher is not None:
+        # e.g. SemanticMatcher.semantic_comparison_batch: the whole table at once
+        matched = batch_matcher(
+            [set(skills) for skills in df["truth"]],
+            [set(skills) for skills in df["parser"]],
+        )
+    elif matcher is not None:
+        matched = [
+            matcher(set(truth), set(parser))
+            for truth, parser in zip(df["truth"], df["parser"])
+        ]
+    if matched is not None:
+        df = df.with_columns(
+            pl.Series("truth", [list(m) for m in matched], dtype=SKILLS)
+        )
 
-        parser = {
-            norm(s)
-            for s in df_parser.filter(
-                (pl.col("CANDIDATE_ID") == cid) & (pl.col("Skill_Type") == skill_type)
-            )["Skill"].to_list()
-            if isinstance(s, str)
-        }
-        if parser:
-            parser_ids.add(cid)
+    df = df.with_columns(
+        pl.col("truth").list.set_intersection("parser").alias("tp_skills"),
+        pl.col("truth").list.set_difference("parser").alias("fn_skills"),
+        pl.col("parser").list.set_difference("truth").alias("fp_skills"),
+    )
+    tp, fp, fn = (
+        df.select(pl.col(f"{k}_skills").list.len().sum()).item()
+        for k in ("tp", "fp", "fn")
+    )
+    df_tn = df.filter(~has_truth & ~has_parser)
+    tn = df_tn.height
 
-        if matcher is not None:
-            truth = matcher(truth, parser)
+    features = ["CANDIDATE_ID", "Gender", "Location", "length"]
+    spans = [SPANS_COLUMN] if span_extractor is not None else []
+    source = df.select(
+        ROW,
+        *features,
+        pl.col("Translated_CV").alias("cv_text"),
+        pl.col("CV_text_anon").alias("cv_italian"),
+        *spans,
+    )
 
-        # TP
-        tp_skills = truth & parser
-        tp += len(tp_skills)
+    return Result(
+        Conf(tp, fp, tn, fn),
         collect_confusion_rows(
-            tp_rows,
-            row,
-            features,
-            set(tp_skills),
-            "Both regex & parser found this skill.",
-        )
-
-        # FN
-        fn_skills = truth - parser
-        fn += len(fn_skills)
+            df, "tp_skills", "Both regex & parser found this skill."
+        ),
+        collect_confusion_rows(
+            df,
+            "fp_skills",
+            "Parser output contains skill not found by rule-based extractor.",
+        ),
         collect_confusion_rows(
-            fn_rows,
-            row,
-            features,
-            set(fn_skills),
+            df,
+            "fn_skills",
             "Rule-based extractor found skill but parser missed it.",
-        )
-
-        # FP
-        fp_skills = parser - truth
-        fp += len(fp_skills)
+        ),
         collect_confusion_rows(
-            fp_rows,
-            row,
-            features,
-            set(fp_skills),
-            "Parser output contains skill not found by rule-based extractor.",
-        )
-
-        # TN
-        if not truth and not parser:
-            tn += 1
-            collect_confusion_rows(
-                tn_rows,
-                row,
-                features,
-                {None},
-                "No skill found by either extractor or parser.",
-            )
+            df_tn, None, "No skill found by either extractor or parser."
+        ),
+        source,
+    )
 
-    if verbose:
-        both = truth_ids & parser_ids
-        only_t = truth_ids - parser_ids
-        only_p = parser_ids - truth_ids
-        print(f"Regex positive candidates        : {len(truth_ids)}")
-        print(f"Parser positive candidates: {len(parser_ids)}")
-        print(f"- Both regex & parser   : {len(both)}")
-        print(f"- Only regex            : {len(only_t)}")
-        print(f"- Only parser           : {len(only_p)}\n")
 
-    return Result(
-        Conf(tp, fp, tn, fn),
-        tp_rows,
-        fp_rows,
-        fn_rows,
-        tn_rows,
+def coverage_threshold_sweep(
+    df_cv: pl.DataFrame,
+    df_parser: pl.DataFrame,
+    skill_type: str,
+    extractor: Optional[Callable[[str], Set[str]]],
+    sweep: Callable[
+        [List[Set[str]], List[Set[str]], Sequence[float]], Dict[float, Conf]
+    ],
+    thresholds: Sequence[float],
+    norm: Callable[[str], str] = str.lower,
+    n_workers: int = 1,
+    chunk_size: int = 256,
+    span_extractor: Optional[SpanExtractor] = None,
+) -> pl.DataFrame:
+    # calibration curve of a matcher, e.g. SemanticMatcher.threshold_sweep: the
+    # counts compute_candidate_coverage would give at each threshold
+    df = candidate_skill_lists(
+        df_cv,
+        df_parser,
+        skill_type,
+        extractor,
+        norm,
+        n_workers,
+        chunk_size,
+        span_extractor,
+    )
+    confs = sweep(
+        [set(skills) for skills in df["truth"]],
+        [set(skills) for skills in df["parser"]],
+        thresholds,
     )
+    return pl.DataFrame([{"threshold": t, **confs[t].as_dict()} for t in thresholds])
 
 
 def error_rates_by_group(
@@ -133,23 +271,35 @@ def error_rates_by_group(
     disparate_impact: bool = True,
 ) -> pl.DataFrame:
     metrics = metrics or []
-    df_tp = pl.DataFrame(result.tp_rows)
-    df_fp = pl.DataFrame(result.fp_rows)
-    df_fn = pl.DataFrame(result.fn_rows)
-    df_tn = pl.DataFrame(result.tn_rows)
+    kinds = ["tp", "fp", "fn", "tn"]
 
-    tp_cnt = df_tp.group_by(group_col).len().rename({"len": "tp"})
-    fp_cnt = df_fp.group_by(group_col).len().rename({"len": "fp"})
-    fn_cnt = df_fn.group_by(group_col).len().rename({"len": "fn"})
-    tn_cnt = df_tn.group_by(group_col).len().rename({"len": "tn"})
+    # group labels come from the features stored with each CV of the result;
+    # from the population they must be one per candidate, as a candidate
+    # listed twice would otherwise multiply its counts in the join
+    if group_col in result.source.columns:
+        key = ROW
+        labels = result.source.select(ROW, group_col)
+    else:
+        key = "CANDIDATE_ID"
+        labels = df_population.select("CANDIDATE_ID", group_col).unique()
+        if labels["CANDIDATE_ID"].is_duplicated().any():
+            raise ValueError(f"Candidates with more than one '{group_col}' label")
+    counts = (
+        pl.concat(
+            [
+                getattr(result, kind).select(key, pl.lit(kind).alias("kind"))
+                for kind in kinds
+            ]
+        )
+        .join(labels, on=key)
+        .group_by(group_col)
+        .agg([(pl.col("kind") == kind).sum().alias(kind) for kind in kinds])
+    )
 
     pop_cnt = df_population.group_by(group_col).agg(pl.count().alias("total"))
 
     df = (
-        pop_cnt.join(tp_cnt, on=group_col, how="left")
-        .join(fp_cnt, on=group_col, how="left")
-        .join(fn_cnt, on=group_col, how="left")
-        .join(tn_cnt, on=group_col, how="left")
+        pop_cnt.join(counts, on=group_col, how="left")
         .fill_null(0)
         .with_columns(pl.sum_horizontal("tp", "fp", "fn", "tn").alias("total_skills"))
     )
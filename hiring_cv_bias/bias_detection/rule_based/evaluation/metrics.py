@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Dict, List, NamedTuple
+from typing import NamedTuple
+
+import polars as pl
 
 
 @dataclass(frozen=True)
@@ -67,9 +69,44 @@ class Conf:
         return self.selection_rate / sr_ref if sr_ref else 0.0
 
 
+# Confusion rows are kept as (CANDIDATE_ID, cv_row, skill, reason) frames:
+# candidate features, CV texts and, when extracted, the match spans in cv_text
+# live once in `source` and are joined in lazily by the `*_rows` views. cv_row
+# is the row of the CV in the evaluated frame, so a candidate with several CVs
+# gets each skill with its own CV.
 class Result(NamedTuple):
     conf: Conf
-    tp_rows: List[Dict]
-    fp_rows: List[Dict]
-    fn_rows: List[Dict]
-    tn_rows: List[Dict]
+    tp: pl.DataFrame
+    fp: pl.DataFrame
+    fn: pl.DataFrame
+    tn: pl.DataFrame
+    source: pl.DataFrame
+
+    def rows(self, kind: str) -> pl.DataFrame:
+        frame: pl.DataFrame = getattr(self, kind)
+        texts = [c for c in (*TEXT_COLUMNS, SPANS_COLUMN) if c in self.source.columns]
+        features = [c for c in self.source.columns if c not in (ROW, *texts)]
+        return frame.join(self.source.drop("CANDIDATE_ID"), on=ROW, how="left").select(
+            *features, "skill", *texts, "reason"
+        )
+
+    @property
+    def tp_rows(self) -> pl.DataFrame:
+        return self.rows("tp")
+
+    @property
+    def fp_rows(self) -> pl.DataFrame:
+        return self.rows("fp")
+
+    @property
+    def fn_rows(self) -> pl.DataFrame:
+        return self.rows("fn")
+
+    @property
+    def tn_rows(self) -> pl.DataFrame:
+        return self.rows("tn")
+
+
+TEXT_COLUMNS = ["cv_text", "cv_italian"]
+ROW = "cv_row"
+SPANS_COLUMN = "cv_spans"
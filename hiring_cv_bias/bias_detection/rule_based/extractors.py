@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, Optional, Set
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
 
+import polars as pl
+
+from hiring_cv_bias.bias_detection.rule_based import patterns
 from hiring_cv_bias.bias_detection.rule_based.patterns import (
-    LANGUAGE_REGEXES_EN,
-    LANGUAGE_VARIANTS,
     driver_license_pattern_eng,
+    driver_license_pattern_eng_rs,
 )
+from hiring_cv_bias.bias_detection.rule_based.scanners import lower_aligned
+from hiring_cv_bias.parallel import parallel_map
+from hiring_cv_bias.utils import python_strip, python_word_chars, to_rust_regex
+
+Span = Tuple[str, int, int]  # (label, start, end)
+SpanExtractor = Callable[[str], List[Span]]
 
 
 def extract_driver_license(text: str) -> Set[str]:
@@ -29,19 +38,65 @@ def norm_driver_license(skill: Optional[str]) -> str:
     return skill
 
 
+def driver_license_spans(text: str) -> List[Span]:
+    return [
+        ("driver_license", *m.span())
+        for m in driver_license_pattern_eng.finditer(lower_aligned(text))
+    ]
+
+
+# Native Polars versions of the functions above: they run multithreaded over
+# the whole column instead of calling Python once per row.
+
+
+def driver_license_expr(text: Union[str, pl.Expr]) -> pl.Expr:
+    text = pl.col(text) if isinstance(text, str) else text
+    text = python_word_chars(text.str.to_lowercase())
+    return text.str.contains(driver_license_pattern_eng_rs)
+
+
+def norm_driver_license_expr(skill: Union[str, pl.Expr]) -> pl.Expr:
+    skill = pl.col(skill) if isinstance(skill, str) else skill
+    skill = python_strip(skill.str.to_lowercase())
+    matchable = python_word_chars(skill)
+    return (
+        pl.when(
+            matchable.str.contains(to_rust_regex(_driver_code))
+            | matchable.str.contains(driver_license_pattern_eng_rs)
+        )
+        .then(pl.lit("driver_license"))
+        .otherwise(skill)
+        .fill_null("")
+    )
+
+
 # ---------------------------------
 
 
 def extract_languages(text: str) -> Set[str]:
+    return patterns.language_scanner.scan(text.lower())
+
+
+def language_spans(text: str) -> List[Span]:
+    return patterns.language_scanner.spans(lower_aligned(text))
+
+
+def extract_languages_regex(text: str) -> Set[str]:
+    # reference implementation: one full scan per language
     text = text.lower()
-    return {lang for lang, rx in LANGUAGE_REGEXES_EN.items() if rx.search(text)}
+    return {
+        lang for lang, rx in patterns.LANGUAGE_REGEXES_EN.items() if rx.search(text)
+    }
 
 
-_reverse_language_map: Dict[str, str] = {
-    variant.lower(): code
-    for code, variants in LANGUAGE_VARIANTS.items()
-    for variant in variants
-}
+@lru_cache(maxsize=None)
+def _reverse_language_map() -> Dict[str, str]:
+    return {
+        variant.lower(): code
+        for code, variants in patterns.LANGUAGE_VARIANTS.items()
+        for variant in variants
+    }
+
 
 _missing: Set[str] = set()
 
@@ -52,9 +107,100 @@ def norm_languages(skill: Optional[str]) -> str:
 
     raw = skill.strip()
     key = raw.lower()
-    code = _reverse_language_map.get(key)
+    code = _reverse_language_map().get(key)
 
     if not code:
         _missing.add(raw)
 
     return code or ""
+
+
+# ---------------------------------
+
+
+def extract_job_titles(text: str) -> Set[str]:
+    return patterns.jobs_matcher.find_titles(text)
+
+
+def job_title_spans(text: str) -> List[Span]:
+    return patterns.jobs_matcher.spans(text)
+
+
+# ---------------------------------
+# Batch API: one pass per extractor over a text column, keeping match positions
+# so highlighting does not need to search the text again.
+
+SPAN_EXTRACTORS: Dict[str, SpanExtractor] = {
+    "driver_license": driver_license_spans,
+    "language": language_spans,
+    "job_title": job_title_spans,
+}
+
+SPANS = pl.List(pl.Struct({"label": pl.String, "start": pl.Int64, "end": pl.Int64}))
+
+
+class _SpanRecords:
+    # fn's spans as SPANS records, [] for missing texts; picklable for workers
+    def __init__(self, fn: SpanExtractor) -> None:
+        self.fn = fn
+
+    def __call__(self, text: Optional[str]) -> List[Dict[str, Union[str, int]]]:
+        if not isinstance(text, str):
+            return []
+        return [{"label": lb, "start": s, "end": e} for lb, s, e in self.fn(text)]
+
+
+def extract_spans(
+    texts: pl.Series,
+    extractors: Optional[Mapping[str, SpanExtractor]] = None,
+    n_workers: Optional[int] = 1,
+    chunk_size: int = 256,
+) -> pl.DataFrame:
+    """
+    One List(Struct{label, start, end}) column per extractor, aligned with
+    texts. Each extractor scans the texts once, over n_workers processes.
+    """
+    extractors = SPAN_EXTRACTORS if extractors is None else extractors
+    values = texts.to_list()
+    return pl.DataFrame(
+        [
+            pl.Series(
+                name,
+                parallel_map(
+                    _SpanRecords(fn),
+                    values,
+                    n_workers=n_workers,
+                    chunk_size=chunk_size,
+                    initializer=patterns.warm_extractors,
+                ),
+                dtype=SPANS,
+            )
+            for name, fn in extractors.items()
+        ]
+    )
+
+
+def span_labels(spans: Union[str, pl.Expr]) -> pl.Expr:
+    # the distinct labels of a SPANS column, i.e. what the set extractors find
+    spans = pl.col(spans) if isinstance(spans, str) else spans
+    return spans.list.eval(pl.element().struct.field("label")).list.unique()
+
+
+# CSV has no nested types: spans are saved as JSON text and read back with these
+def spans_to_json(col: str) -> pl.Expr:
+    return pl.struct(col).struct.json_encode().alias(col)
+
+
+def spans_from_json(col: str) -> pl.Expr:
+    return pl.col(col).str.json_decode(pl.Struct({col: SPANS})).struct.field(col)
+
+
+def non_overlapping(spans: Iterable[Mapping]) -> List[Tuple[int, int]]:
+    # (start, end) pairs to highlight: leftmost first, longest on ties
+    out: List[Tuple[int, int]] = []
+    for start, end in sorted(
+        {(sp["start"], sp["end"]) for sp in spans}, key=lambda se: (se[0], -se[1])
+    ):
+        if not out or start >= out[-1][1]:
+            out.append((start, end))
+    return out
@@ -8,7 +8,12 @@ from hiring_cv_bias.config import (
     REVERSE_MATCHING_PATH,
 )
 from hiring_cv_bias.exploration.gender_analysis import get_category_distribution
-from hiring_cv_bias.utils import load_data, load_excel_sheets
+from hiring_cv_bias.utils import (
+    load_data,
+    load_excel_sheets,
+    python_word_chars,
+    to_rust_regex,
+)
 
 driver_license_pattern = re.compile(
     r"(?:"
@@ -27,6 +32,13 @@ def has_driver_license(text: str) -> bool:
     return bool(driver_license_pattern.search(text))
 
 
+def has_driver_license_expr(text: str) -> pl.Expr:
+    # same \w/\s rewriting as extractors.driver_license_expr
+    return python_word_chars(pl.col(text).str.to_lowercase()).str.contains(
+        to_rust_regex(driver_license_pattern)
+    )
+
+
 def prepare_data():
     df_cv = load_data(CANDIDATE_CVS_TRANSLATED_PATH)
     df_skills = load_data(PARSED_DATA_PATH)
@@ -39,9 +51,7 @@ def prepare_data():
     )
 
     df_cv_with_gender = df_cv_with_gender.with_columns(
-        pl.col("Translated_CV")
-        .map_elements(has_driver_license, return_dtype=bool)
-        .alias("has_driving_license")
+        has_driver_license_expr("Translated_CV").alias("has_driving_license")
     )
 
     return df_cv_with_gender, df_skills
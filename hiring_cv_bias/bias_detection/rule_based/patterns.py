@@ -1,11 +1,18 @@
+import hashlib
+import json
+import os
 import re
-
-import polars as pl
-import pycountry
-from langcodes import Language
-
-from hiring_cv_bias.bias_detection.fuzzy.utils import normalize_jobs
-from hiring_cv_bias.config import JOBS_PATH
+from functools import lru_cache
+from importlib.metadata import version
+from typing import Any, Callable, Dict, List, Pattern, Set
+
+from hiring_cv_bias.bias_detection.fuzzy.occupations import occupation_dictionary
+from hiring_cv_bias.bias_detection.rule_based.scanners import (
+    JobTitleMatcher,
+    LanguageScanner,
+)
+from hiring_cv_bias.config import CACHE_DIR, JOBS_PATH
+from hiring_cv_bias.utils import to_rust_regex
 
 RED = "\033[31m"
 RESET = "\033[0m"
@@ -21,57 +28,197 @@ driver_license_pattern_eng = re.compile(
     re.IGNORECASE | re.UNICODE,
 )
 
+# same pattern for Polars' native (Rust regex) string expressions
+driver_license_pattern_eng_rs = to_rust_regex(driver_license_pattern_eng)
+
+
+# The contextual forms of LANGUAGE_REGEXES_EN, used by the single-pass scanner.
+# Left contexts are reversed since they are matched backwards from the name;
+# spaces are dropped as in the VERBOSE pattern ("native speaker" is matched as
+# "nativespeaker").
+language_left_context_rev = re.compile(
+    r"""
+    \s+(?:fo)?rekaepsevitan
+    |\s+s?egaugnal
+    |(?:\s+egaugnal)?(?:\s+eht)?\s+fo\s+egdelwonk
+    |\s+ni\s+ycneiciforp
+    |\s+(?:ni)?noitacifitrec
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+language_right_context = re.compile(
+    r"""
+    \s+(?:spoken|written|oral)
+    |\s*(?:A1|A2|B1|B2|C1|C2|native)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
 
 # ---------------------------------------------------
+# The language and job artifacts below are expensive to build (pycountry and
+# langcodes lookups, ESCO csv parsing, huge regexes), so they are only created
+# on first attribute access. Variant tables are also cached on disk, keyed by
+# the versions of their inputs; job titles come from the compiled occupation
+# dictionary (fuzzy.occupations), whose on-disk artifact is keyed by the
+# content of the jobs csv. The registry reads JOBS_PATH and CACHE_DIR when an
+# artifact is built; reset() drops the built ones, e.g. after the csv changed.
+
+PATTERNS_CACHE_VERSION = 2
+
+
+def build_language_variants() -> Dict[str, Set[str]]:
+    import pycountry
+    from langcodes import Language
+
+    variants_by_code = {}
+    for lang in pycountry.languages:
+        if not hasattr(lang, "alpha_2"):
+            continue
+
+        # ISO code & name
+        code = lang.alpha_2.lower()
+        name_en = lang.name.lower()
+
+        try:
+            native = Language.get(code).display_name(code).lower()
+        except LookupError:
+            native = ""
+
+        variants = {name_en}
+        if native:
+            variants.add(native)
+
+        variants_by_code[code] = variants
+    return variants_by_code
+
+
+def build_normalized_jobs(
+    jobs_path: str = JOBS_PATH, cache_dir: str = CACHE_DIR
+) -> List[str]:
+    return occupation_dictionary(jobs_path, cache_dir).jobs()
+
+
+def patterns_cache_key() -> str:
+    inputs = {
+        "cache_version": PATTERNS_CACHE_VERSION,
+        **{pkg: version(pkg) for pkg in ("pycountry", "langcodes", "language-data")},
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def load_artifacts(cache_dir: str = CACHE_DIR) -> Dict[str, Any]:
+    path = os.path.join(cache_dir, f"patterns_{patterns_cache_key()[:16]}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    artifacts = {
+        "language_variants": {
+            code: sorted(variants)
+            for code, variants in build_language_variants().items()
+        },
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifacts, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return artifacts
+
+
+def _language_variants() -> Dict[str, Set[str]]:
+    return {
+        code: set(variants)
+        for code, variants in load_artifacts(CACHE_DIR)["language_variants"].items()
+    }
+
+
+def _language_regexes() -> Dict[str, Pattern[str]]:
+    return {
+        lang: re.compile(
+            rf"""
+            \b(?:{"|".join(map(re.escape, variants))})\b
+            |native speaker(?: of)?\s+(?:{"|".join(map(re.escape, variants))})
+            |languages?\s+(?:{"|".join(map(re.escape, variants))})
+            |knowledge\s+of\s+(?:the\s+)?(?:language\s+)?(?:{"|".join(map(re.escape, variants))})
+            |proficiency\s+in\s+(?:{"|".join(map(re.escape, variants))})
+            |certification(?: in)?\s+(?:{"|".join(map(re.escape, variants))})
+            |(?:{"|".join(map(re.escape, variants))})\s+(?:spoken|written|oral)
+            |(?:{"|".join(map(re.escape, variants))})\s*(?:A1|A2|B1|B2|C1|C2|native)
+            """,
+            re.IGNORECASE | re.VERBOSE,
+        )
+        for lang, variants in _get("LANGUAGE_VARIANTS").items()
+    }
+
+
+def _languages_pattern() -> Pattern[str]:
+    return re.compile(
+        "|".join(f"({pat.pattern})" for pat in _get("LANGUAGE_REGEXES_EN").values()),
+        re.IGNORECASE | re.VERBOSE,
+    )
 
-LANGUAGE_VARIANTS = {}
 
-for lang in pycountry.languages:
-    if not hasattr(lang, "alpha_2"):
-        continue
+def _language_scanner() -> LanguageScanner:
+    return LanguageScanner(
+        _get("LANGUAGE_VARIANTS"), language_left_context_rev, language_right_context
+    )
 
-    # ISO code & name
-    code = lang.alpha_2.lower()
-    name_en = lang.name.lower()
 
-    try:
-        native = Language.get(code).display_name(code).lower()
-    except LookupError:
-        native = ""
+def _jobs_pattern() -> Pattern[str]:
+    return re.compile("|".join(rf"\b{job}\b" for job in _get("normalized_jobs")))
 
-    variants = {name_en}
-    if native:
-        variants.add(native)
 
-    LANGUAGE_VARIANTS[code] = variants
+def _jobs_matcher() -> JobTitleMatcher:
+    # same matches as jobs_pattern, found in one linear pass over the text
+    return JobTitleMatcher(_get("normalized_jobs"))
 
 
-LANGUAGE_REGEXES_EN = {
-    lang: re.compile(
-        rf"""
-        \b(?:{"|".join(map(re.escape, variants))})\b
-        |native speaker(?: of)?\s+(?:{"|".join(map(re.escape, variants))})
-        |languages?\s+(?:{"|".join(map(re.escape, variants))})
-        |knowledge\s+of\s+(?:the\s+)?(?:language\s+)?(?:{"|".join(map(re.escape, variants))})
-        |proficiency\s+in\s+(?:{"|".join(map(re.escape, variants))})
-        |certification(?: in)?\s+(?:{"|".join(map(re.escape, variants))})
-        |(?:{"|".join(map(re.escape, variants))})\s+(?:spoken|written|oral)
-        |(?:{"|".join(map(re.escape, variants))})\s*(?:A1|A2|B1|B2|C1|C2|native)
-        """,
-        re.IGNORECASE | re.VERBOSE,
-    )
-    for lang, variants in LANGUAGE_VARIANTS.items()
+_LAZY: Dict[str, Callable[[], Any]] = {
+    "LANGUAGE_VARIANTS": _language_variants,
+    "LANGUAGE_REGEXES_EN": _language_regexes,
+    "languages_pattern_eng": _languages_pattern,
+    "language_scanner": _language_scanner,
+    "occupations": lambda: occupation_dictionary(JOBS_PATH, CACHE_DIR),
+    "normalized_jobs": lambda: build_normalized_jobs(JOBS_PATH, CACHE_DIR),
+    "jobs": lambda: _get("normalized_jobs"),
+    "jobs_pattern": _jobs_pattern,
+    "jobs_matcher": _jobs_matcher,
 }
 
 
-languages_pattern_eng = re.compile(
-    "|".join(f"({pat.pattern})" for pat in LANGUAGE_REGEXES_EN.values()),
-    re.IGNORECASE | re.VERBOSE,
-)
+def _get(name: str) -> Any:
+    if name not in globals():
+        globals()[name] = _LAZY[name]()
+    return globals()[name]
 
 
-# ---------------------------------------------------
-jobs = pl.read_csv(JOBS_PATH)["preferredLabel"].to_list()
-normalized_jobs = normalize_jobs(jobs)
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _get(name)
+
+
+def warm(*names: str) -> None:
+    # build the given artifacts (all of them by default) ahead of first use
+    for name in names or _LAZY:
+        _get(name)
+
+
+def reset() -> None:
+    # forget every built artifact, so the next access builds it again from the
+    # current inputs (reusing the on-disk artifacts whose key still matches)
+    for name in _LAZY:
+        globals().pop(name, None)
+    load_artifacts.cache_clear()
+    occupation_dictionary.cache_clear()
+
+
+# artifacts used by the extractors, built once per parallel_map worker
+EXTRACTOR_ARTIFACTS = ("language_scanner", "jobs_matcher")
+
 
-jobs_pattern = re.compile("|".join(rf"\b{job}\b" for job in normalized_jobs))
+def warm_extractors() -> None:
+    warm(*EXTRACTOR_ARTIFACTS)
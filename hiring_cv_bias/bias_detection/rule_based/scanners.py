@@ -0,0 +1,249 @@
+from collections import defaultdict, deque
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Union,
+)
+
+
+def is_word_char(c: str) -> bool:
+    # same definition as `\w` in Python's unicode regexes
+    return c.isalnum() or c == "_"
+
+
+def is_boundary(text: str, pos: int) -> bool:
+    # `\b`: exactly one of the characters around pos is a word character
+    before = pos > 0 and is_word_char(text[pos - 1])
+    after = pos < len(text) and is_word_char(text[pos])
+    return before != after
+
+
+def lower_aligned(text: str) -> str:
+    # str.lower(), except for the few characters whose lowercase form is longer
+    # (e.g. "İ"), which are kept so offsets still point into the original text
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern automaton reporting every (possibly overlapping) occurrence
+    of the patterns in a single left-to-right pass over the text.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = list(patterns)
+        self.lengths = [len(p) for p in self.patterns]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for c in pattern:
+                nxt = self._goto[node].get(c)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][c] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(idx)
+
+        # failure links and, for each node, the closest suffix node with output
+        self._fail = [0] * len(self._goto)
+        self._link = [-1] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(c, 0)
+                self._fail[child] = target
+                self._link[child] = target if self._out[target] else self._link[target]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (pattern_index, start, end) for every occurrence in text."""
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        lengths = self.lengths
+        node = 0
+        for i, c in enumerate(text):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            hit = node if out[node] else link[node]
+            while hit > 0:
+                for idx in out[hit]:
+                    yield idx, i + 1 - lengths[idx], i + 1
+                hit = link[hit]
+
+
+class TitleMatch:
+    # the subset of `re.Match` used by the snippet helpers
+    __slots__ = ("string", "title", "_span")
+
+    def __init__(self, string: str, title: str, start: int, end: int) -> None:
+        self.string = string
+        self.title = title
+        self._span = (start, end)
+
+    def span(self) -> Tuple[int, int]:
+        return self._span
+
+    def start(self) -> int:
+        return self._span[0]
+
+    def end(self) -> int:
+        return self._span[1]
+
+    def group(self, index: int = 0) -> str:
+        if index != 0:
+            raise IndexError("no such group")
+        return self.string[self._span[0] : self._span[1]]
+
+
+class JobTitleMatcher:
+    """
+    Drop-in replacement for the `\\b(?:job_1|job_2|...)\\b` alternation.
+
+    Titles are matched literally with the same word-boundary rules as `\\b`,
+    and overlapping hits are resolved like the regex does: leftmost start
+    first, then the title listed first.
+    """
+
+    def __init__(self, titles: Iterable[str], ignore_case: bool = False) -> None:
+        self.titles = list(titles)
+        self.ignore_case = ignore_case
+        keys = [t.lower() for t in self.titles] if ignore_case else self.titles
+        self._automaton = AhoCorasick(keys)
+
+    def _scan_text(self, text: str) -> str:
+        return lower_aligned(text) if self.ignore_case else text
+
+    def spans(self, text: str) -> List[Tuple[str, int, int]]:
+        best: Dict[int, Tuple[int, int]] = {}
+        for idx, start, end in self._automaton.iter(self._scan_text(text)):
+            if not (is_boundary(text, start) and is_boundary(text, end)):
+                continue
+            current = best.get(start)
+            if current is None or idx < current[0]:
+                best[start] = (idx, end)
+
+        found = []
+        pos = 0
+        for start in sorted(best):
+            if start < pos:
+                continue
+            idx, end = best[start]
+            found.append((self.titles[idx], start, end))
+            pos = end
+        return found
+
+    def find_titles(self, text: str) -> Set[str]:
+        return {title for title, _, _ in self.spans(text)}
+
+    # --- `re.Pattern`-like interface ---
+
+    def finditer(self, text: str) -> Iterator[TitleMatch]:
+        for title, start, end in self.spans(text):
+            yield TitleMatch(text, title, start, end)
+
+    def search(self, text: str) -> Optional[TitleMatch]:
+        return next(self.finditer(text), None)
+
+    def findall(self, text: str) -> List[str]:
+        return [text[start:end] for _, start, end in self.spans(text)]
+
+    def sub(self, repl: Union[str, Callable[[TitleMatch], str]], text: str) -> str:
+        parts = []
+        pos = 0
+        for m in self.finditer(text):
+            parts.append(text[pos : m.start()])
+            parts.append(repl(m) if callable(repl) else repl)
+            pos = m.end()
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+class LanguageScanner:
+    """
+    Single-pass equivalent of running one regex per language.
+
+    Every occurrence of a language name is found with one automaton scan and
+    kept if it stands alone as a word, is preceded by a context such as
+    "native speaker of" (`left_context` is matched on the reversed text,
+    ending where the name starts) or is followed by one such as "B2" or
+    "spoken" (`right_context`, matched where the name ends). The spans of a
+    name found through a context cover the context too.
+    """
+
+    def __init__(
+        self,
+        variants: Dict[str, Set[str]],
+        left_context: Pattern[str],
+        right_context: Pattern[str],
+    ) -> None:
+        codes: Dict[str, List[str]] = defaultdict(list)
+        for code, names in variants.items():
+            for name in names:
+                codes[name].append(code)
+        self._names = list(codes)
+        self._codes = [codes[name] for name in self._names]
+        self._automaton = AhoCorasick(self._names)
+        self.left_context = left_context
+        self.right_context = right_context
+
+    def _accepts(self, text: str, reverse: str, start: int, end: int) -> bool:
+        return (
+            (is_boundary(text, start) and is_boundary(text, end))
+            or self.right_context.match(text, end) is not None
+            or self.left_context.match(reverse, len(text) - start) is not None
+        )
+
+    def _span(
+        self, text: str, reverse: str, start: int, end: int
+    ) -> Optional[Tuple[int, int]]:
+        # the name widened to the contexts around it, None if not accepted
+        left = self.left_context.match(reverse, len(text) - start)
+        right = self.right_context.match(text, end)
+        if left is None and right is None:
+            if is_boundary(text, start) and is_boundary(text, end):
+                return start, end
+            return None
+        return (
+            len(text) - left.end() if left is not None else start,
+            right.end() if right is not None else end,
+        )
+
+    def spans(self, text: str) -> List[Tuple[str, int, int]]:
+        reverse = text[::-1]
+        found: List[Tuple[str, int, int]] = []
+        for idx, start, end in self._automaton.iter(text):
+            span = self._span(text, reverse, start, end)
+            if span is not None:
+                found.extend((code, *span) for code in self._codes[idx])
+        return found
+
+    def scan(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        reverse = text[::-1]
+        for idx, start, end in self._automaton.iter(text):
+            codes = self._codes[idx]
+            if found.issuperset(codes):
+                continue
+            if self._accepts(text, reverse, start, end):
+                found.update(codes)
+        return found
@@ -1,5 +1,4 @@
-from re import Pattern
-from typing import List, Optional
+from typing import Iterable, List, Mapping, Optional
 
 import polars as pl
 from IPython.display import display
@@ -7,7 +6,11 @@ from IPython.display import display
 from hiring_cv_bias.bias_detection.rule_based.evaluation.compare_parser import (
     error_rates_by_group,
 )
-from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import Result
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import (
+    SPANS_COLUMN,
+    Result,
+)
+from hiring_cv_bias.bias_detection.rule_based.extractors import non_overlapping
 
 RED, RESET = "\033[31m", "\033[0m"
 
@@ -43,14 +46,15 @@ def print_report(
         display(df_rates)
     else:
         tot = df_population.height
-        print("Overall FP-rate:", round(len(result.fp_rows) / tot, 3))
-        print("Overall FN-rate:", round(len(result.fn_rows) / tot, 3))
+        print("Overall FP-rate:", round(result.fp.height / tot, 3))
+        print("Overall FN-rate:", round(result.fn.height / tot, 3))
 
 
-def highlight_snippets(text: str, pattern: Pattern[str], context_chars=40) -> List[str]:
+def highlight_snippets(
+    text: str, spans: Iterable[Mapping], context_chars=40
+) -> List[str]:
     snippets = []
-    for match in pattern.finditer(text):
-        start, end = match.span()
+    for start, end in non_overlapping(spans):
         snippet_start = max(start - context_chars, 0)
         snippet_end = min(end + context_chars, len(text))
         before = text[snippet_start:start]
@@ -62,11 +66,13 @@ def highlight_snippets(text: str, pattern: Pattern[str], context_chars=40) -> Li
     return snippets or ["No occurrence found."]
 
 
-def print_highlighted_cv(row: dict, pattern: Pattern[str]) -> None:
+def print_highlighted_cv(row: dict, spans: Optional[Iterable[Mapping]] = None) -> None:
+    # by default the spans stored with the row by compute_candidate_coverage
+    spans = row[SPANS_COLUMN] if spans is None else spans
     header = f"\nCANDIDATE ID: {row['CANDIDATE_ID']} - GENERE: {row['Gender']}"
     reason = f"Reason: {row['reason']}"
     separator = "-" * 80
-    snippets = highlight_snippets(row["cv_text"], pattern=pattern)
+    snippets = highlight_snippets(row["cv_text"], spans=spans)
     print(header)
     print(reason)
     print(separator)
@@ -0,0 +1,187 @@
+import os
+import random
+import re
+import time
+from typing import Callable, Dict, List, Tuple
+
+import polars as pl
+
+from hiring_cv_bias.cleaning.raw_cv import (
+    add_length_column,
+    assess_translation_completeness,
+    detect_corrupted_cvs,
+    detect_repetitive_cvs,
+    detect_vocab_sparsity,
+    filter_placeholder_tails,
+    is_unusual_char,
+    profile_cvs,
+)
+
+CV_LINES = [
+    "Esperienza lavorativa",
+    "Magazziniere presso Rossi S.p.A. (2018 - 2021)",
+    "  Gestione ordini e inventario  ",
+    "Competenze: Excel, SAP, muletto",
+    "Lingue: inglese B2, francese A1",
+    "Patente B, automunito",
+    "Disponibilità immediata",
+    "Istruzione: diploma di ragioneria",
+    "",
+    "Città: Milano ★",
+    "Référence: ☎ 02 1234 5678",
+]
+
+
+def make_synthetic_cv_frame(
+    n: int, n_distinct: int = 2000, seed: int = 0
+) -> pl.DataFrame:
+    # a pool of varied CVs (repeated lines, placeholder tails, symbols, blank
+    # and empty texts) sampled up to n rows
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(n_distinct):
+        lines = rng.choices(CV_LINES, k=rng.randint(0, 30))
+        if rng.random() < 0.1:
+            lines += [lines[-1] if lines else "ciao"] * rng.randint(1, 20)
+        text = rng.choice(["\n", "\r\n", "\n\n"]).join(lines)
+        if rng.random() < 0.1:
+            text += " " + "X" * rng.randint(5, 40) + rng.choice(["", " ", "\n"])
+        pool.append(text)
+    texts = rng.choices(pool, k=n)
+    return pl.DataFrame(
+        {
+            "CANDIDATE_ID": range(n),
+            "CV_text_anon": texts,
+            "Translated_CV": [t[: len(t) // 2] for t in texts],
+        }
+    )
+
+
+# --- the previous row-by-row checks, as a reference ---
+
+
+def row_repetition(text: str) -> Tuple[int, float]:
+    if not text:
+        return 0, 1.0
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return 0, 1.0
+    return len(lines), 1 - len(set(lines)) / len(lines)
+
+
+def row_unusual_frac(text: str) -> float:
+    if not text:
+        return 0.0
+    return sum(1 for c in text if is_unusual_char(c)) / len(text)
+
+
+def row_checks(text_col: str = "CV_text_anon") -> Dict[str, Callable]:
+    text = pl.col(text_col)
+    placeholder = re.compile(r"X{20,}\s*$")
+
+    def repetitive(df: pl.DataFrame) -> pl.DataFrame:
+        return df.with_columns(
+            text.map_elements(
+                lambda s: row_repetition(s)[0], return_dtype=pl.Int64
+            ).alias("n_lines"),
+            text.map_elements(
+                lambda s: row_repetition(s)[1], return_dtype=pl.Float64
+            ).alias("repetition_ratio"),
+        ).filter(pl.col("repetition_ratio") > 0.5)
+
+    return {
+        "add_length_column": lambda df: df.with_columns(
+            text.map_elements(
+                lambda s: len(s.strip()) if s else 0, return_dtype=pl.Int64
+            ).alias("len_anon")
+        ),
+        "detect_repetitive_cvs": repetitive,
+        "filter_placeholder_tails": lambda df: df.filter(
+            text.map_elements(
+                lambda s: bool(placeholder.search(s)), return_dtype=pl.Boolean
+            )
+        ),
+        "detect_corrupted_cvs": lambda df: df.with_columns(
+            text.map_elements(row_unusual_frac, return_dtype=pl.Float64).alias(
+                "unusual_frac"
+            )
+        ).filter(pl.col("unusual_frac") > 0.02),
+        "assess_translation_completeness": lambda df: df.with_columns(
+            text.map_elements(lambda s: len(s or ""), return_dtype=pl.Int64).alias(
+                "orig_len"
+            ),
+            pl.col("Translated_CV")
+            .map_elements(lambda s: len(s or ""), return_dtype=pl.Int64)
+            .alias("trans_len"),
+        ).with_columns(
+            (pl.col("trans_len") / pl.col("orig_len")).fill_null(0.0).alias("len_ratio")
+        ),
+    }
+
+
+def native_checks(text_col: str = "CV_text_anon") -> Dict[str, Callable]:
+    return {
+        "add_length_column": lambda df: add_length_column(df, text_col, "len_anon"),
+        "detect_repetitive_cvs": lambda df: detect_repetitive_cvs(df, text_col, 0.5),
+        "filter_placeholder_tails": lambda df: filter_placeholder_tails(
+            df, text_col, char="X", min_run=20
+        ),
+        "detect_corrupted_cvs": lambda df: detect_corrupted_cvs(df, text_col, 0.02),
+        "assess_translation_completeness": lambda df: assess_translation_completeness(
+            df, text_col
+        ),
+    }
+
+
+def benchmark_quality_checks(df: pl.DataFrame) -> pl.DataFrame:
+    """Seconds per check, row-by-row vs native, on the same frame."""
+    rows: List[dict] = []
+    reference = row_checks()
+    for name, native in native_checks().items():
+        start = time.perf_counter()
+        expected = reference[name](df)
+        row_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = native(df)
+        native_s = time.perf_counter() - start
+
+        rows.append(
+            {
+                "check": name,
+                "identical": found.equals(expected),
+                "map_elements_s": row_s,
+                "native_s": native_s,
+                "speedup": row_s / native_s,
+            }
+        )
+    return pl.DataFrame(rows)
+
+
+def benchmark_profile(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    The notebook's separate checks, one pass each, vs profile_cvs. Both do
+    the same work: expect about the same time on one core.
+    """
+    start = time.perf_counter()
+    flagged = [
+        add_length_column(df).filter(pl.col("len_anon") < 300),
+        detect_repetitive_cvs(df, "CV_text_anon", max_repetition=0.5),
+        detect_vocab_sparsity(df, "CV_text_anon", min_words=30, min_ttr=0.3),
+        filter_placeholder_tails(df, "CV_text_anon", char="X", min_run=20),
+        detect_corrupted_cvs(df, "CV_text_anon", max_unusual_frac=0.02),
+        assess_translation_completeness(df).filter(pl.col("len_ratio") < 0.7),
+    ]
+    timings = {"separate checks": time.perf_counter() - start}
+    dropped = set().union(*(f["CANDIDATE_ID"] for f in flagged))
+
+    for n_chunks in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        profile = profile_cvs(df, n_chunks=n_chunks)
+        timings[f"profile_cvs, n_chunks={n_chunks}"] = time.perf_counter() - start
+        same = set(profile.filter("drop")["CANDIDATE_ID"]) == dropped
+        print(f"n_chunks={n_chunks}: same dropped CVs: {same}")
+
+    return pl.DataFrame(
+        {"method": list(timings), "seconds": list(timings.values())}
+    ).with_columns((df.height / pl.col("seconds")).alias("cvs_per_s"))
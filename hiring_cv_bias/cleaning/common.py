@@ -1,5 +1,5 @@
 import re
-from typing import Any, List, Pattern
+from typing import Any, List, Pattern, Tuple, TypeVar
 
 import matplotlib.pyplot as plt
 import polars as pl
@@ -7,6 +7,8 @@ import polars_ds as pds
 import seaborn as sns
 from IPython.display import display
 
+from hiring_cv_bias.utils import to_rust_regex
+
 
 def inspect_missing(df: pl.DataFrame):
     total = df.height
@@ -66,33 +68,61 @@ def filter_out_candidate_ids(
 _PLACEHOLDER_PATTERN = re.compile(r"X{5,}")
 
 
-def find_garbage_skill_rows(
-    df: pl.DataFrame,
+def garbage_skill_mask(
     skill_col: str = "Skill",
-    id_col: str = "CANDIDATE_ID",
     min_len: int = 2,
     max_len: int = 100,
     placeholder_pattern: Pattern[str] = _PLACEHOLDER_PATTERN,
-) -> pl.DataFrame:
-    # clean mask: length, has_letter, no_placeholder
-    length = pl.col(skill_col).map_elements(
-        lambda s: len(s or ""), return_dtype=pl.Int64
+) -> pl.Expr:
+    # True for garbage: bad length, no letter or a placeholder (null is empty)
+    skill = pl.col(skill_col)
+    length = skill.str.len_chars().fill_null(0)
+    valid_length = length.is_between(min_len, max_len)
+    has_letter = skill.str.contains("[A-Za-z]").fill_null(False)
+    placeholder = skill.str.contains(to_rust_regex(placeholder_pattern)).fill_null(
+        False
     )
-    valid_length = (length >= min_len) & (length <= max_len)
-    has_letter = pl.col(skill_col).map_elements(
-        lambda s: bool(re.search(r"[A-Za-z]", s or "")), return_dtype=pl.Boolean
-    )
-    no_placeholder = pl.col(skill_col).map_elements(
-        lambda s: not bool(placeholder_pattern.search(s or "")),
-        return_dtype=pl.Boolean,
+    return ~valid_length | ~has_letter | placeholder
+
+
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
+
+
+def split_garbage_skill_rows(
+    df: FrameT,
+    skill_col: str = "Skill",
+    min_len: int = 2,
+    max_len: int = 100,
+    placeholder_pattern: Pattern[str] = _PLACEHOLDER_PATTERN,
+) -> Tuple[FrameT, FrameT]:
+    """
+    (kept, dropped) rows of a skills frame, split on garbage_skill_mask.
+
+    A DataFrame is split in one pass over the mask. A LazyFrame gives the two
+    filters as lazy frames over the same plan; collecting them materializes
+    both.
+    """
+    mask = garbage_skill_mask(skill_col, min_len, max_len, placeholder_pattern)
+    if isinstance(df, pl.LazyFrame):
+        return df.filter(~mask), df.filter(mask)
+
+    parts = df.with_columns(mask.alias("_garbage")).partition_by(
+        "_garbage", as_dict=True, include_key=False
     )
-    keep_mask = valid_length & has_letter & no_placeholder
+    empty = df.clear()
+    return parts.get((False,), empty), parts.get((True,), empty)
+
 
-    cleaned = df.filter(keep_mask)
-    dropped = df.join(
-        cleaned.select([id_col, skill_col, "Skill_Type"]),
-        on=[id_col, skill_col, "Skill_Type"],
-        how="anti",
+def find_garbage_skill_rows(
+    df: FrameT,
+    skill_col: str = "Skill",
+    min_len: int = 2,
+    max_len: int = 100,
+    placeholder_pattern: Pattern[str] = _PLACEHOLDER_PATTERN,
+) -> FrameT:
+    # the dropped rows of split_garbage_skill_rows
+    _, dropped = split_garbage_skill_rows(
+        df, skill_col, min_len, max_len, placeholder_pattern
     )
     return dropped
 
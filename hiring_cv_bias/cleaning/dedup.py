@@ -0,0 +1,220 @@
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from hiring_cv_bias.cleaning.raw_cv import NON_SPACE
+
+# multiplier of the rolling shingle hash (odd, so it is invertible mod 2**64)
+SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+EMPTY = np.iinfo(np.uint32).max
+
+
+def shingle_hashes(
+    texts: pl.Series, shingle_size: int = 5, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    64-bit hashes of the word shingles of every text, as (doc, hash) arrays
+    sorted by doc. Words are the lowercased str.split() tokens; a text shorter
+    than shingle_size words is a single shingle.
+    """
+    words = (
+        texts.str.to_lowercase()
+        .str.extract_all(rf"{NON_SPACE}+")
+        .to_frame("word")
+        .with_row_index("doc")
+        .explode("word")
+        .drop_nulls("word")
+    )
+    doc = words["doc"].to_numpy()
+    token = words["word"].hash(seed).to_numpy()
+    n = len(token)
+    if n == 0:
+        return np.empty(0, np.int64), np.empty(0, np.uint64)
+
+    starts = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]])
+    ends = np.r_[starts[1:], n]
+    doc_end = np.repeat(ends, ends - starts)
+
+    # polynomial hash of the (up to) shingle_size words from each position
+    position = np.arange(n)
+    shingle = token.copy()
+    for j in range(1, shingle_size):
+        inside = position + j < doc_end
+        nxt = token[np.minimum(position + j, n - 1)]
+        with np.errstate(over="ignore"):
+            shingle = np.where(inside, shingle * SHINGLE_MIX + nxt, shingle)
+
+    full = position + shingle_size <= doc_end
+    short = np.zeros(n, dtype=bool)
+    short[starts[ends - starts < shingle_size]] = True
+    keep = full | short
+    return doc[keep].astype(np.int64), shingle[keep]
+
+
+def minhash_signatures(
+    texts: pl.Series,
+    num_perm: int = 128,
+    shingle_size: int = 5,
+    seed: int = 0,
+    block_size: int = 2048,
+) -> np.ndarray:
+    """
+    (n_texts, num_perm) uint32 MinHash signatures. Permutation p maps a shingle
+    hash x to the high 32 bits of a_p * x + b_p (multiply-shift hashing, a_p
+    odd); its minimum over the shingles estimates the Jaccard similarity of two
+    texts as the share of equal columns. Texts without words get EMPTY rows.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * 2 + 1
+    b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+    doc, shingles = shingle_hashes(texts, shingle_size, seed)
+    signatures = np.full((len(texts), num_perm), EMPTY, dtype=np.uint32)
+    # small blocks of shingles hashed in place (temporaries cost more than the
+    # arithmetic), each reduced to its docs' minima
+    buffer = np.empty((block_size, num_perm), dtype=np.uint64)
+    for start in range(0, len(shingles), block_size):
+        block = shingles[start : start + block_size, None]
+        hashed = buffer[: len(block)]
+        np.multiply(block, a, out=hashed)
+        np.add(hashed, b, out=hashed)
+        np.right_shift(hashed, np.uint64(32), out=hashed)
+
+        block_doc = doc[start : start + block_size]
+        first = np.flatnonzero(np.r_[True, block_doc[1:] != block_doc[:-1]])
+        ids = block_doc[first]
+        minima = np.minimum.reduceat(hashed, first, axis=0).astype(np.uint32)
+        signatures[ids] = np.minimum(signatures[ids], minima)
+    return signatures
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose S-curve threshold
+    (1 / bands) ** (1 / rows) is the closest one not above `threshold`, so
+    pairs at the threshold are likely to share a bucket.
+    """
+    splits = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [s for s in splits if (1 / s[0]) ** (1 / s[1]) <= threshold]
+    return max(below or splits[-1:], key=lambda s: (1 / s[0]) ** (1 / s[1]))
+
+
+def run_offsets(sizes: np.ndarray) -> np.ndarray:
+    # 0..s-1 for every run size s, concatenated
+    return np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+
+def bucket_pairs(key: np.ndarray, max_bucket_size: int = 100) -> np.ndarray:
+    """
+    (m, 2) pairs of positions sharing a key. Every pair of a bucket is listed,
+    so a dissimilar member cannot hide two duplicates from each other; a
+    bucket larger than max_bucket_size (boilerplate shared by many CVs) only
+    pairs each member with its first one, bounding its cost to linear.
+    """
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+    sizes = np.diff(np.r_[starts, len(key)])
+
+    small = (sizes > 1) & (sizes <= max_bucket_size)
+    # member i of a bucket of size s pairs with the s - 1 - i after it
+    member = np.repeat(starts[small], sizes[small]) + run_offsets(sizes[small])
+    after = np.repeat(starts[small] + sizes[small], sizes[small]) - member - 1
+    first = np.repeat(member, after)
+    second = first + 1 + run_offsets(after)
+
+    large = sizes > max_bucket_size
+    star_first = np.repeat(starts[large], sizes[large] - 1)
+    star_second = star_first + 1 + run_offsets(sizes[large] - 1)
+
+    positions = np.stack([np.r_[first, star_first], np.r_[second, star_second]], 1)
+    return order[positions.astype(np.int64)]
+
+
+def near_duplicate_pairs(
+    signatures: np.ndarray,
+    threshold: float = 0.8,
+    bands: Optional[int] = None,
+    max_bucket_size: int = 100,
+    verify_block: int = 100_000,
+) -> np.ndarray:
+    """
+    (m, 2) row pairs whose estimated Jaccard similarity reaches threshold.
+
+    Each band of `rows` signature columns is hashed to a bucket key; rows
+    sharing a key in any band are candidates (see bucket_pairs). Candidates
+    are verified on the full signatures, `verify_block` pairs at a time.
+    Connected components of the pairs then recover the clusters.
+    """
+    num_perm = signatures.shape[1]
+    if bands is None:
+        bands, rows = lsh_params(num_perm, threshold)
+    else:
+        rows = num_perm // bands
+    docs = np.flatnonzero((signatures != EMPTY).any(axis=1))
+    sig = signatures[docs].astype(np.uint64)
+
+    candidates = []
+    for band in range(bands):
+        key = np.zeros(len(docs), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for col in sig[:, band * rows : (band + 1) * rows].T:
+                key = key * SHINGLE_MIX + col
+        pairs = np.sort(bucket_pairs(key, max_bucket_size), axis=1)
+        candidates.append(pairs)
+
+    pairs = np.unique(np.concatenate(candidates), axis=0)
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    keep = np.concatenate(
+        [
+            (sig[block[:, 0]] == sig[block[:, 1]]).mean(axis=1) >= threshold
+            for block in np.array_split(pairs, -(-len(pairs) // verify_block))
+        ]
+    )
+    return docs[pairs[keep]]
+
+
+def find_near_duplicates(
+    df: pl.DataFrame,
+    text_col: str = "CV_text_anon",
+    id_col: str = "CANDIDATE_ID",
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    shingle_size: int = 5,
+    seed: int = 0,
+    max_bucket_size: int = 100,
+) -> pl.DataFrame:
+    """
+    Clusters of near-duplicate CVs: one row per candidate that has at least
+    one near duplicate, with its `cluster` id and `cluster_size`.
+    """
+    signatures = minhash_signatures(df[text_col], num_perm, shingle_size, seed)
+    pairs = near_duplicate_pairs(signatures, threshold, max_bucket_size=max_bucket_size)
+    n = df.height
+    graph = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n)
+    )
+    _, labels = connected_components(graph, directed=False)
+
+    return (
+        df.select(id_col)
+        .with_columns(pl.Series("cluster", labels, dtype=pl.Int64))
+        .with_columns(pl.len().over("cluster").alias("cluster_size"))
+        .filter(pl.col("cluster_size") > 1)
+        .sort("cluster", id_col)
+    )
+
+
+def duplicate_ids_to_drop(
+    clusters: pl.DataFrame, id_col: str = "CANDIDATE_ID"
+) -> List[Any]:
+    # every member of a cluster but its smallest id, for filter_out_candidate_ids
+    return (
+        clusters.filter(pl.col(id_col) != pl.col(id_col).min().over("cluster"))
+        .get_column(id_col)
+        .to_list()
+    )
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import uuid
+from functools import partial
+from importlib.metadata import version
+from typing import Optional, Tuple
+
+import polars as pl
+from langdetect import DetectorFactory, detect_langs
+from langdetect.detector import Detector
+from langdetect.lang_detect_exception import LangDetectException
+
+from hiring_cv_bias.config import CACHE_DIR
+from hiring_cv_bias.parallel import parallel_map
+
+LANGUAGES_DIR = CACHE_DIR + "languages/"
+UNKNOWN = Detector.UNKNOWN_LANG
+
+# make language detection deterministic
+DetectorFactory.seed = 0
+
+DETECTIONS = {"key": pl.String, "language": pl.String, "confidence": pl.Float64}
+
+
+def sample_text(
+    text: str, sample_chars: Optional[int] = 2000, n_windows: int = 4
+) -> str:
+    # evenly spaced windows rather than a prefix, so a header full of Italian
+    # names and addresses does not decide alone
+    if sample_chars is None or len(text) <= sample_chars:
+        return text
+    width = sample_chars // n_windows
+    step = (len(text) - width) / max(n_windows - 1, 1)
+    starts = [int(i * step) for i in range(n_windows)]
+    return " ".join(text[start : start + width] for start in starts)
+
+
+def detect_language(text: str, sample_chars: Optional[int] = 2000) -> Tuple[str, float]:
+    try:
+        best = detect_langs(sample_text(text, sample_chars))[0]
+    except LangDetectException:
+        return UNKNOWN, 0.0
+    return best.lang, best.prob
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_path(cache_dir: str, sample_chars: Optional[int]) -> str:
+    # results are only reused with the same detector and sample size
+    return os.path.join(
+        cache_dir,
+        f"langdetect-{version('langdetect')}_seed-{DetectorFactory.seed}"
+        f"_sample-{sample_chars}",
+    )
+
+
+def read_cache(path: str) -> pl.DataFrame:
+    if not os.path.isdir(path) or not any(
+        name.endswith(".parquet") for name in os.listdir(path)
+    ):
+        return pl.DataFrame(schema=DETECTIONS)
+    return pl.read_parquet(os.path.join(path, "*.parquet")).unique("key")
+
+
+def write_cache(path: str, detections: pl.DataFrame) -> None:
+    # one new shard per call, renamed into place once complete
+    os.makedirs(path, exist_ok=True)
+    shard = os.path.join(path, f"{os.getpid()}-{uuid.uuid4().hex}")
+    detections.write_parquet(f"{shard}.tmp")
+    os.replace(f"{shard}.tmp", f"{shard}.parquet")
+
+
+def detect_languages(
+    texts: pl.Series,
+    sample_chars: Optional[int] = 2000,
+    n_workers: Optional[int] = 1,
+    chunk_size: int = 256,
+    cache_dir: Optional[str] = LANGUAGES_DIR,
+) -> pl.DataFrame:
+    """
+    `language` and `confidence` of every text, in order (null for null texts,
+    UNKNOWN with confidence 0 when nothing can be detected).
+
+    langdetect only reads `sample_chars` characters of each text (None reads
+    it all). Distinct texts are detected once, over n_workers processes (None
+    for every core), and the results are stored as parquet shards under
+    cache_dir keyed by the sha256 of the text, so later runs only detect new
+    texts.
+    """
+    keys = pl.Series(
+        "key", [None if t is None else text_key(t) for t in texts], dtype=pl.String
+    )
+    path = cache_path(cache_dir, sample_chars) if cache_dir else None
+    cached = read_cache(path) if path else pl.DataFrame(schema=DETECTIONS)
+
+    missing = (
+        pl.DataFrame({"key": keys, "text": texts})
+        .drop_nulls("key")
+        .unique("key", maintain_order=True)
+        .join(cached, on="key", how="anti")
+    )
+    if missing.height:
+        found = parallel_map(
+            partial(detect_language, sample_chars=sample_chars),
+            missing["text"],
+            n_workers=n_workers,
+            chunk_size=chunk_size,
+            desc="langdetect",
+        )
+        detections = pl.DataFrame(
+            {
+                "key": missing["key"],
+                "language": [language for language, _ in found],
+                "confidence": [confidence for _, confidence in found],
+            },
+            schema=DETECTIONS,
+        )
+        if path:
+            write_cache(path, detections)
+        cached = pl.concat([cached, detections])
+
+    return (
+        keys.to_frame()
+        .join(cached, on="key", how="left", maintain_order="left")
+        .select("language", "confidence")
+    )
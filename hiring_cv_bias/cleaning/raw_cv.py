@@ -1,22 +1,70 @@
 import random
 import re
-from typing import List, Pattern, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
 import matplotlib.pyplot as plt
 import polars as pl
 from langdetect import DetectorFactory, detect
 
+from hiring_cv_bias.cleaning.language import detect_languages
+from hiring_cv_bias.utils import python_strip
+
+# Python's whitespace (str.split, str.strip) is Rust's \s plus \x1c-\x1f
+NON_SPACE = r"[^\s\x1c-\x1f]"
+# a non-empty line of str.splitlines(), stripped
+LINE = rf"{NON_SPACE}(?:[^\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]*{NON_SPACE})?"
+# complement of is_unusual_char
+UNUSUAL_CHAR = r"[^\x20-\x7E\xA0-\xFF\u2000-\u206F\n\r\t]"
+
+
+def length_expr(text_col: str) -> pl.Expr:
+    return python_strip(pl.col(text_col)).str.len_chars().cast(pl.Int64)
+
+
+def line_stats(lines: pl.Expr) -> List[pl.Expr]:
+    # n_lines and the share of them repeating an earlier one, over a column of
+    # extract_all(LINE) lists
+    return [
+        lines.list.len().cast(pl.Int64).alias("n_lines"),
+        pl.when(lines.list.len() == 0)
+        .then(1.0)
+        .otherwise(1 - lines.list.n_unique() / lines.list.len())
+        .alias("repetition_ratio"),
+    ]
+
+
+def word_stats(words: pl.Expr) -> List[pl.Expr]:
+    # type-token ratio over a column of lowercased str.split() lists
+    return [
+        words.list.len().cast(pl.Int64).alias("total_words"),
+        words.list.n_unique().cast(pl.Int64).alias("unique_words"),
+        pl.when(words.list.len() == 0)
+        .then(0.0)
+        .otherwise(words.list.n_unique() / words.list.len())
+        .alias("ttr"),
+    ]
+
+
+def placeholder_tail_expr(text_col: str, char: str = "X", min_run: int = 10) -> pl.Expr:
+    # the character repeated min_run times at the end of the string
+    pattern = rf"{re.escape(char)}{{{min_run},}}[\s\x1c-\x1f]*$"
+    return pl.col(text_col).str.contains(pattern)
+
+
+def unusual_frac_expr(text_col: str) -> pl.Expr:
+    total = pl.col(text_col).str.len_chars()
+    return (
+        pl.when(total == 0)
+        .then(0.0)
+        .otherwise(pl.col(text_col).str.count_matches(UNUSUAL_CHAR) / total)
+    )
+
 
 def add_length_column(
     df: pl.DataFrame, text_col: str = "CV_text_anon", length_col: str = "len_anon"
 ) -> pl.DataFrame:
-    return df.with_columns(
-        [
-            pl.col(text_col)
-            .map_elements(lambda s: len(s.strip()) if s else 0, return_dtype=pl.Int64)
-            .alias(length_col)
-        ]
-    )
+    return df.with_columns(length_expr(text_col).alias(length_col))
 
 
 def find_and_print_short_cvs(
@@ -53,31 +101,19 @@ def plot_length_histogram(
     bin_size: int = 300,
     max_bin: int = 3000,
 ) -> None:
-    lengths = df.with_columns(
-        [
-            pl.col(text_col)
-            .map_elements(lambda s: len(s.strip()) if s else 0, return_dtype=pl.Int64)
-            .alias("length")
-        ]
-    )
+    lengths = df.with_columns(length_expr(text_col).alias("length"))
 
     # Build bin labels
     bin_edges = list(range(0, max_bin + bin_size, bin_size))
     labels = [f"{start}-{start + bin_size}" for start in bin_edges[:-1]]
     labels[-1] = f"{bin_edges[-2]}+"
 
-    def assign_bin(n: int) -> str:
-        if n >= max_bin:
-            return labels[-1]
-        idx = n // bin_size
-        return labels[idx]
-
+    # lengths past the last bin fall into the open-ended one
     binned = lengths.with_columns(
-        [
-            pl.col("length")
-            .map_elements(assign_bin, return_dtype=pl.Utf8)
-            .alias("length_bin")
-        ]
+        (pl.col("length") // bin_size)
+        .clip(upper_bound=len(labels) - 1)
+        .replace_strict(dict(enumerate(labels)), return_dtype=pl.Utf8)
+        .alias("length_bin")
     )
 
     bin_counts = (
@@ -113,25 +149,12 @@ def detect_repetitive_cvs(
     text_col: str = "CV_text_anon",
     max_repetition: float = 0.5,
 ) -> pl.DataFrame:
-    def analyze(text: str) -> Tuple[int, float]:
-        if not text:
-            return 0, 1.0
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        total = len(lines)
-        if total == 0:
-            return 0, 1.0
-        unique = len(set(lines))
-        return total, 1 - unique / total
-
-    annotated = df.with_columns(
-        [
-            pl.col(text_col)
-            .map_elements(lambda s: analyze(s)[0], return_dtype=pl.Int64)
-            .alias("n_lines"),
-            pl.col(text_col)
-            .map_elements(lambda s: analyze(s)[1], return_dtype=pl.Float64)
-            .alias("repetition_ratio"),
-        ]
+    # share of the non-blank lines (stripped) that repeat an earlier one,
+    # extracting the lines only once
+    annotated = (
+        df.with_columns(pl.col(text_col).str.extract_all(LINE).alias("_lines"))
+        .with_columns(line_stats(pl.col("_lines")))
+        .drop("_lines")
     )
 
     repetitive = annotated.filter(pl.col("repetition_ratio") > max_repetition)
@@ -178,14 +201,7 @@ def detect_vocab_sparsity(
 def filter_placeholder_tails(
     df: pl.DataFrame, text_col: str = "CV_text_anon", char: str = "X", min_run: int = 10
 ) -> pl.DataFrame:
-    # Compile regex matching the character repeated min_run times at end of string
-    pattern: Pattern[str] = re.compile(rf"{re.escape(char)}{{{min_run},}}\s*$")
-
-    return df.filter(
-        pl.col(text_col).map_elements(
-            lambda s: bool(pattern.search(s)), return_dtype=pl.Boolean
-        )
-    )
+    return df.filter(placeholder_tail_expr(text_col, char, min_run))
 
 
 def is_unusual_char(c: str) -> bool:
@@ -208,20 +224,7 @@ def detect_corrupted_cvs(
     text_col: str = "CV_text_anon_clean",
     max_unusual_frac: float = 0.01,
 ) -> pl.DataFrame:
-    def compute_frac(s: str) -> float:
-        if not s:
-            return 0.0
-        total = len(s)
-        bad = sum(1 for c in s if is_unusual_char(c))
-        return bad / total
-
-    annotated = df.with_columns(
-        [
-            pl.col(text_col)
-            .map_elements(lambda s: compute_frac(s), return_dtype=pl.Float64)
-            .alias("unusual_frac")
-        ]
-    )
+    annotated = df.with_columns(unusual_frac_expr(text_col).alias("unusual_frac"))
 
     return annotated.filter(pl.col("unusual_frac") > max_unusual_frac)
 
@@ -232,14 +235,8 @@ def assess_translation_completeness(
     trans_col: str = "Translated_CV",
 ) -> pl.DataFrame:
     df = df.with_columns(
-        [
-            pl.col(orig_col)
-            .map_elements(lambda s: len(s or ""), return_dtype=pl.Int64)
-            .alias("orig_len"),
-            pl.col(trans_col)
-            .map_elements(lambda s: len(s or ""), return_dtype=pl.Int64)
-            .alias("trans_len"),
-        ]
+        pl.col(orig_col).str.len_chars().cast(pl.Int64).alias("orig_len"),
+        pl.col(trans_col).str.len_chars().cast(pl.Int64).alias("trans_len"),
     )
     df = df.with_columns(
         # Compute len_ratio and trans_empty
@@ -260,3 +257,160 @@ def is_this_language(text: str, language: str) -> bool:
         return bool(detect(text) == language)
     except Exception:
         return False
+
+
+# the signals of profile_cvs, each computed on its own text column
+QUALITY_SIGNALS = (
+    "length",
+    "repetition",
+    "vocabulary",
+    "placeholder",
+    "corrupted",
+    "translation",
+)
+
+
+def signal_columns(
+    text_col: str, text_cols: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    # text_col for every signal, unless text_cols names another column
+    text_cols = text_cols or {}
+    unknown = set(text_cols) - set(QUALITY_SIGNALS)
+    if unknown:
+        raise ValueError(
+            f"Unknown quality signals {sorted(unknown)}, expected {QUALITY_SIGNALS}"
+        )
+    return {signal: text_cols.get(signal, text_col) for signal in QUALITY_SIGNALS}
+
+
+@dataclass(frozen=True)
+class QualityRules:
+    """
+    Which CVs profile_cvs drops: each threshold enables one rule, None disables
+    it. The defaults are the thresholds of the data cleaning notebook, where
+    the language check is only reported.
+    """
+
+    min_length: Optional[int] = 300
+    max_repetition: Optional[float] = 0.5
+    min_words: Optional[int] = 30
+    min_ttr: float = 0.3
+    placeholder_char: str = "X"
+    placeholder_min_run: Optional[int] = 20
+    max_unusual_frac: Optional[float] = 0.02
+    min_translation_ratio: Optional[float] = 0.7
+    language: Optional[str] = None
+
+    def flags(self) -> Dict[str, pl.Expr]:
+        # rule name -> the profile rows breaking it
+        flags = {}
+        if self.min_length is not None:
+            flags["too_short"] = pl.col("length") < self.min_length
+        if self.max_repetition is not None:
+            flags["repetitive"] = pl.col("repetition_ratio") > self.max_repetition
+        if self.min_words is not None:
+            flags["sparse_vocab"] = (pl.col("total_words") < self.min_words) | (
+                pl.col("ttr") < self.min_ttr
+            )
+        if self.placeholder_min_run is not None:
+            flags["placeholder_tail"] = pl.col("placeholder_tail")
+        if self.max_unusual_frac is not None:
+            flags["corrupted"] = pl.col("unusual_frac") > self.max_unusual_frac
+        if self.min_translation_ratio is not None:
+            flags["incomplete_translation"] = (
+                pl.col("len_ratio") < self.min_translation_ratio
+            )
+        if self.language is not None:
+            flags["wrong_language"] = pl.col("language") != self.language
+        return flags
+
+
+def quality_profile(
+    lf: pl.LazyFrame,
+    rules: QualityRules = QualityRules(),
+    text_col: str = "CV_text_anon",
+    trans_col: str = "Translated_CV",
+    id_col: str = "CANDIDATE_ID",
+    text_cols: Optional[Dict[str, str]] = None,
+) -> pl.LazyFrame:
+    cols = signal_columns(text_col, text_cols)
+    signals = [
+        length_expr(cols["length"]).alias("length"),
+        pl.col(cols["repetition"]).str.extract_all(LINE).alias("_lines"),
+        pl.col(cols["vocabulary"])
+        .str.to_lowercase()
+        .str.extract_all(rf"{NON_SPACE}+")
+        .alias("_words"),
+        unusual_frac_expr(cols["corrupted"]).alias("unusual_frac"),
+        pl.col(cols["translation"]).str.len_chars().cast(pl.Int64).alias("orig_len"),
+        pl.col(trans_col).str.len_chars().cast(pl.Int64).alias("trans_len"),
+    ]
+    if rules.placeholder_min_run is not None:
+        signals.append(
+            placeholder_tail_expr(
+                cols["placeholder"], rules.placeholder_char, rules.placeholder_min_run
+            ).alias("placeholder_tail")
+        )
+    if rules.language is not None:
+        # columns of language.detect_languages, added by profile_cvs
+        signals += [pl.col("language"), pl.col("confidence")]
+
+    # nulls (missing text) break no rule, as with the separate checks
+    flags = {name: flag.fill_null(False) for name, flag in rules.flags().items()}
+    reasons = [pl.when(flag).then(pl.lit(name)) for name, flag in flags.items()]
+    return (
+        lf.select(id_col, *signals)
+        .with_columns(
+            *line_stats(pl.col("_lines")),
+            *word_stats(pl.col("_words")),
+            (pl.col("trans_len") / pl.col("orig_len"))
+            .fill_null(0.0)
+            .alias("len_ratio"),
+        )
+        .drop("_lines", "_words")
+        .with_columns(
+            pl.concat_list(reasons).list.drop_nulls().alias("drop_reasons")
+            if reasons
+            else pl.lit([], dtype=pl.List(pl.String)).alias("drop_reasons")
+        )
+        .with_columns((pl.col("drop_reasons").list.len() > 0).alias("drop"))
+    )
+
+
+def profile_cvs(
+    df: pl.DataFrame,
+    rules: QualityRules = QualityRules(),
+    text_col: str = "CV_text_anon",
+    trans_col: str = "Translated_CV",
+    id_col: str = "CANDIDATE_ID",
+    n_chunks: int = 1,
+    n_workers: Optional[int] = 1,
+    text_cols: Optional[Dict[str, str]] = None,
+) -> pl.DataFrame:
+    """
+    Every quality signal of the separate checks (length, repetition, TTR,
+    unusual characters, placeholder tail, translation ratio, language) in one
+    frame, one row per candidate. `drop_reasons` lists the rules a CV breaks
+    and `drop` tells whether it goes. It evaluates the same expressions as
+    the separate checks and takes about as long as running them all (see
+    benchmark.benchmark_profile): it is a report, not a faster path.
+
+    Every signal reads text_col, and the translation ratio compares it with
+    trans_col; text_cols maps a signal of QUALITY_SIGNALS to another column,
+    as the separate checks can each be given their own, e.g.
+    {"vocabulary": "Translated_CV"}.
+
+    With n_chunks > 1 the frame is profiled in that many slices, collected in
+    parallel by Polars. The language rule runs detect_languages on trans_col
+    first, over n_workers processes.
+    """
+    if rules.language is not None:
+        df = df.hstack(detect_languages(df[trans_col], n_workers=n_workers))
+    size = max(1, -(-df.height // max(1, n_chunks)))
+    profiles = [
+        quality_profile(
+            df.lazy().slice(start, size), rules, text_col, trans_col, id_col, text_cols
+        )
+        for start in range(0, max(df.height, 1), size)
+    ]
+    return pl.concat(pl.collect_all(profiles))
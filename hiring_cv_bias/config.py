@@ -11,6 +11,7 @@ CANDIDATE_CVS_TRANSLATED_PATH = CV_DIR + "/Candidate_CVs_translated.csv"
 JOBS_PATH = FUZZY_DATA_DIR + "occupations_en.csv"
 EXTRACTED_JOBS = FUZZY_DATA_DIR + "Parsed_Jobs.csv"
 HARD_SOFT_SKILLS = DATA_DIR + "hard_soft_skills.csv"
+CACHE_DIR = DATA_DIR + "cache/"
 
 JOB_LINKS = [
     "https://www.zippia.com/baby-sitter-jobs/demographics/",
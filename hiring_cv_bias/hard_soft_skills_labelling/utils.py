@@ -1,19 +1,18 @@
+import copy
+import time
+from typing import List, Optional, Tuple
+
 import polars as pl
+import torch
 import transformers
 from tqdm.notebook import tqdm
 
+# the defining modules, not the lazy `transformers` namespace, which type
+# checkers resolve to placeholder classes
+from transformers.cache_utils import DynamicCache
+from transformers.modeling_utils import PreTrainedModel
 
-def batch_classify_skills(
-    model: transformers.PreTrainedModel,
-    tokenizer: transformers.PreTrainedTokenizerBase,
-    skills: list[str],
-    batch_size: int,
-) -> list[str]:
-    labels = []
-    for i in tqdm(range(0, len(skills), batch_size)):
-        batch = skills[i : i + batch_size]
-        prompts = [
-            f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+PROMPT_TEMPLATE = """<|begin_of_text|><|start_header_id|>system<|end_header_id|>
         You are a helpful assistant<|eot_id|><|start_header_id|>user<|end_header_id|>
 
         Classify the following skill as either "Hard" or "Soft". Think step-by-step about what the skill involves before giving your answer. If you are unsure or do not know the classification, respond with only the word "Unknown". After your reasoning, respond with only one word: ‘Hard’, ‘Soft’ or ‘Unknown’
@@ -44,33 +43,164 @@ def batch_classify_skills(
         Now classify this skill:
         Skill: {skill}
         Step 1: <|eot_id|><|start_header_id|>assistant<|end_header_id|>"""
-            for skill in batch
-        ]
-
-        inputs = tokenizer(
-            prompts,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-        ).to(model.device)
-
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=150,
-            pad_token_id=tokenizer.eos_token_id,
-            do_sample=False,
-            temperature=None,
-            top_p=None,
-        )
+
+# everything before the skill is the same for every prompt: the system
+# prompt, the instructions and the four examples
+PROMPT_PREFIX = PROMPT_TEMPLATE[: PROMPT_TEMPLATE.index("{skill}")].rstrip(" ")
+
+GENERATION_KWARGS = dict(
+    max_new_tokens=150,
+    do_sample=False,
+    temperature=None,
+    top_p=None,
+)
+
+
+def encode_prefix(
+    model: PreTrainedModel,
+    tokenizer: transformers.PreTrainedTokenizerBase,
+    prefix: str = PROMPT_PREFIX,
+) -> Tuple[List[int], DynamicCache]:
+    # token ids of the shared prefix and its past key/values, computed once
+    ids = tokenizer(prefix)["input_ids"]
+    with torch.no_grad():
+        cache = model(
+            torch.tensor([ids], device=model.device),
+            past_key_values=DynamicCache(),
+            use_cache=True,
+        ).past_key_values
+    return ids, cache
+
+
+def generate_full(
+    model: PreTrainedModel,
+    tokenizer: transformers.PreTrainedTokenizerBase,
+    prompts: List[str],
+) -> torch.Tensor:
+    inputs = tokenizer(
+        prompts,
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+    ).to(model.device)
+
+    # generate comes from GenerationMixin, which the causal LM classes add
+    return model.generate(  # type: ignore[operator]
+        **inputs, pad_token_id=tokenizer.eos_token_id, **GENERATION_KWARGS
+    )
+
+
+def generate_with_prefix(
+    model: PreTrainedModel,
+    tokenizer: transformers.PreTrainedTokenizerBase,
+    prompts: List[str],
+    prefix_ids: List[int],
+    prefix_cache: DynamicCache,
+) -> Optional[torch.Tensor]:
+    """
+    Same generation as generate_full, but only the per-skill suffixes are
+    encoded: a copy of the prefix cache is repeated over the batch. Rows are
+    laid out as prefix, left padding, suffix; the attention mask hides the
+    padding and generate derives the positions from it, so every suffix
+    continues the prefix as in the left-padded full prompts.
+
+    None when a prompt does not tokenize to prefix_ids followed by more tokens
+    (a skill merging with the end of the prefix), so the caller falls back.
+    """
+    n = len(prefix_ids)
+    encoded = tokenizer(prompts, truncation=True)["input_ids"]
+    if any(ids[:n] != prefix_ids or len(ids) == n for ids in encoded):
+        return None
+
+    suffixes = [ids[n:] for ids in encoded]
+    width = max(len(suffix) for suffix in suffixes)
+    # the padding is masked out, any id will do (Llama has no pad token)
+    pad_token_id = tokenizer.pad_token_id
+    if pad_token_id is None:
+        pad_token_id = tokenizer.eos_token_id
+    pad = [pad_token_id] * width
+    input_ids = torch.tensor(
+        [prefix_ids + pad[len(suffix) :] + suffix for suffix in suffixes],
+        device=model.device,
+    )
+    attention_mask = torch.tensor(
+        [
+            [1] * n + [0] * (width - len(suffix)) + [1] * len(suffix)
+            for suffix in suffixes
+        ],
+        device=model.device,
+    )
+    cache = copy.deepcopy(prefix_cache)
+    cache.batch_repeat_interleave(len(prompts))
+
+    # generate comes from GenerationMixin, which the causal LM classes add
+    return model.generate(  # type: ignore[operator]
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        past_key_values=cache,
+        pad_token_id=tokenizer.eos_token_id,
+        **GENERATION_KWARGS,
+    )
+
+
+def batch_classify_skills(
+    model: PreTrainedModel,
+    tokenizer: transformers.PreTrainedTokenizerBase,
+    skills: list[str],
+    batch_size: int,
+    use_prefix_cache: bool = False,
+    verbose: bool = True,
+) -> list[str]:
+    # with use_prefix_cache the few-shot prefix is encoded once and its past
+    # key/values reused by every batch, only the skill suffixes are processed;
+    # off by default until benchmark_prefix_cache has been run on the model
+    prefix = encode_prefix(model, tokenizer) if use_prefix_cache else None
+    labels = []
+    for i in tqdm(range(0, len(skills), batch_size)):
+        batch = skills[i : i + batch_size]
+        prompts = [PROMPT_TEMPLATE.format(skill=skill) for skill in batch]
+
+        outputs = None
+        if prefix is not None:
+            outputs = generate_with_prefix(model, tokenizer, prompts, *prefix)
+        if outputs is None:
+            outputs = generate_full(model, tokenizer, prompts)
 
         decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
         for text in decoded:
-            print(text)
+            if verbose:
+                print(text)
             label = text.split()[-1]
             labels.append(label)
     return labels
 
 
+def benchmark_prefix_cache(
+    model: PreTrainedModel,
+    tokenizer: transformers.PreTrainedTokenizerBase,
+    skills: list[str],
+    batch_size: int,
+) -> pl.DataFrame:
+    # full prompts vs shared-prefix cache on the same skills
+    timings = {}
+    found = {}
+    for use_prefix_cache in (False, True):
+        start = time.perf_counter()
+        found[use_prefix_cache] = batch_classify_skills(
+            model, tokenizer, skills, batch_size, use_prefix_cache, verbose=False
+        )
+        timings[use_prefix_cache] = time.perf_counter() - start
+
+    same = sum(a == b for a, b in zip(found[False], found[True]))
+    print(f"identical labels on {same} / {len(skills)} skills")
+    return pl.DataFrame(
+        {
+            "method": ["full prompts", "shared-prefix cache"],
+            "seconds": [timings[False], timings[True]],
+        }
+    ).with_columns((len(skills) / pl.col("seconds")).alias("skills_per_s"))
+
+
 def clean_results(results: pl.DataFrame) -> pl.DataFrame:
     return results.with_columns(
         pl.when(~pl.col("label").is_in(["Hard", "Soft", "Unknown"]))
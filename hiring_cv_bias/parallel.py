@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Sequence, TypeVar
+
+from tqdm.notebook import tqdm
+
+T = TypeVar("T")
+
+_worker_fn: Optional[Callable[[Any], Any]] = None
+
+
+def _init_worker(
+    fn: Callable[[Any], Any], initializer: Optional[Callable[[], None]]
+) -> None:
+    # runs once in every worker: the function is unpickled a single time
+    # (e.g. a JobParser loads its spaCy model here) and the initializer can
+    # build what fn needs before the first chunk arrives
+    global _worker_fn
+    _worker_fn = fn
+    if initializer is not None:
+        initializer()
+
+
+def _run_chunk(chunk: List[Any]) -> List[Any]:
+    if _worker_fn is None:
+        raise RuntimeError("_run_chunk called outside a parallel_map worker")
+    return [_worker_fn(item) for item in chunk]
+
+
+def chunked(items: Sequence[T], chunk_size: int) -> List[List[T]]:
+    return [list(items[i : i + chunk_size]) for i in range(0, len(items), chunk_size)]
+
+
+def parallel_map(
+    fn: Callable[[Any], T],
+    items: Iterable[Any],
+    n_workers: Optional[int] = 1,
+    chunk_size: int = 256,
+    initializer: Optional[Callable[[], None]] = None,
+    desc: Optional[str] = None,
+) -> List[T]:
+    """
+    [fn(x) for x in items], computed over chunks in a process pool.
+
+    Results come back in input order whatever the completion order of the
+    chunks, so the output is the same as the sequential one. `fn` and
+    `initializer` must be picklable; n_workers=1 runs in-process, None uses
+    every core.
+    """
+    items = list(items)
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(items) <= chunk_size:
+        return [fn(item) for item in tqdm(items, total=len(items), desc=desc)]
+
+    chunks = chunked(items, chunk_size)
+    with ProcessPoolExecutor(
+        max_workers=min(n_workers, len(chunks)),
+        initializer=_init_worker,
+        initargs=(fn, initializer),
+    ) as pool:
+        results = tqdm(pool.map(_run_chunk, chunks), total=len(chunks), desc=desc)
+        return [out for chunk in results for out in chunk]
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Sequence, Tuple
+
+from hiring_cv_bias.config import CACHE_DIR
+
+TRANSLATIONS_DB = CACHE_DIR + "translations.sqlite"
+
+# keys per SELECT, below SQLite's limit on bound parameters
+LOOKUP_CHUNK = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Translations stored in SQLite, keyed by the sha256 of the cleaned text and
+    the target language.
+
+    Every put is committed right away, so a job that dies keeps every batch
+    it finished and a rerun only translates what is missing. WAL mode lets
+    several readers (e.g. a notebook) share the file with a running job.
+    """
+
+    def __init__(self, path: str = TRANSLATIONS_DB) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " PRIMARY KEY (key, target))"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str], target: str) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start : start + LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT key, translation FROM translations"
+                    f" WHERE target = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [target, *chunk],
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, translations: Iterable[Tuple[str, str]], target: str) -> None:
+        # (key, translation) pairs, committed as one transaction
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, target, translation)"
+                " VALUES (?, ?, ?)",
+                [(key, target, translation) for key, translation in translations],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
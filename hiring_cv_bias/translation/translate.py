@@ -1,42 +1,460 @@
 import os
+import random
 import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import polars as pl
+import requests
+from google.api_core import exceptions
+from google.auth import exceptions as auth_exceptions
 from google.cloud import translate_v2 as translate
+from tqdm.auto import tqdm
 
 from hiring_cv_bias.config import CANDIDATE_CVS_PATH
+from hiring_cv_bias.translation.cache import TranslationCache, text_key
 from hiring_cv_bias.utils import load_data
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = (
     "magnetic-market-455110-t2-0dc68481bf13.json"
 )
 
+# quota and transient server/network errors are retried, the rest raised.
+# translate_v2.Client raises api_core errors built from the HTTP status,
+# requests' errors from its session (a connection dropped mid-response is a
+# ChunkedEncodingError, not a ConnectionError) and google.auth's
+# TransportError when refreshing the access token fails
+RETRYABLE = (
+    exceptions.TooManyRequests,
+    exceptions.ServerError,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    auth_exceptions.TransportError,
+)
+
+# quota errors the API reports as 403 Forbidden, told apart by their reason
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, exceptions.Forbidden):
+        return any(
+            isinstance(e, dict) and e.get("reason") in RATE_LIMIT_REASONS
+            for e in error.errors
+        )
+    return isinstance(error, RETRYABLE)
+
+
+# Cloud Translation v2 limits per request
+MAX_BATCH_SIZE = 128
+MAX_BATCH_CHARS = 30_000
+# longer CVs are translated as chunks of at most this many characters
+MAX_CHUNK_CHARS = 5_000
+
+# a sentence ends with . ! ? or ; and the spaces after it
+SENTENCE_END = re.compile(r"[.!?;]+\s+")
+
+Span = Tuple[int, int]
+
+OFFSETS = {
+    name: pl.Int64
+    for name in (
+        "row",
+        "chunk",
+        "source_start",
+        "source_end",
+        "translated_start",
+        "translated_end",
+    )
+}
+
+
+# the cleaning steps of clean_cv_text, in order
+CLEANING_STEPS = [
+    (re.compile("\n"), " "),
+    (re.compile("CV anonimizzato:"), ""),
+    (re.compile('"""'), ""),
+    (re.compile(" +"), " "),
+    (re.compile(" ,"), ","),
+]
+
+
+def _sub_indexed(
+    pattern: re.Pattern, repl: str, text: str, index: List[int]
+) -> Tuple[str, List[int]]:
+    # pattern.sub(repl, text), carrying the raw position of every character;
+    # a replacement takes the positions of the end of the match it is a
+    # suffix of (" ," -> ","), else of its start (" +" -> " ")
+    parts: List[str] = []
+    new_index: List[int] = []
+    pos = 0
+    for m in pattern.finditer(text):
+        parts.append(text[pos : m.start()])
+        new_index.extend(index[pos : m.start()])
+        matched = index[m.start() : m.end()]
+        parts.append(repl)
+        if m.group().endswith(repl):
+            new_index.extend(matched[len(matched) - len(repl) :])
+        else:
+            new_index.extend(matched[: len(repl)])
+        pos = m.end()
+    parts.append(text[pos:])
+    new_index.extend(index[pos:])
+    return "".join(parts), new_index
+
+
+def clean_cv_text_indexed(cv_text: str) -> Tuple[str, List[int]]:
+    """
+    clean_cv_text(cv_text), and for every character of the result its
+    position in cv_text, plus len(cv_text) at the end: the span [start, end)
+    of the cleaned text comes from cv_text[index[start] : index[end - 1] + 1].
+    """
+    index = list(range(len(cv_text) + 1))
+    for pattern, repl in CLEANING_STEPS:
+        cv_text, index = _sub_indexed(pattern, repl, cv_text, index)
+    lowered = cv_text.lower()
+    if len(lowered) != len(cv_text):
+        # a few characters lowercase to more than one (e.g. "İ")
+        index = [
+            i for c, i in zip(cv_text, index) for _ in range(len(c.lower()))
+        ] + index[-1:]
+    return lowered, index
+
 
 def clean_cv_text(cv_text: str) -> str:
-    cv_text = cv_text.replace("\n", " ")
-    cv_text = cv_text.replace("CV anonimizzato:", "")
-    cv_text = cv_text.replace('"""', "")
-    cv_text = re.sub(" +", " ", cv_text)
-    cv_text = cv_text.replace(" ,", ",")
-    cv_text = cv_text.lower()
-    return cv_text
+    return clean_cv_text_indexed(cv_text)[0]
+
+
+_client: Optional[translate.Client] = None
 
 
 def translate_text(text: str, target_language: str = "en") -> str:
-    text = clean_cv_text(text)
-    client = translate.Client()
-    result = client.translate(text, target_language=target_language)
+    # one client for every call, instead of one per CV
+    global _client
+    if _client is None:
+        _client = translate.Client()
+    result = _client.translate(clean_cv_text(text), target_language=target_language)
     return str(result["translatedText"])
 
 
-if __name__ == "main":
-    cv_data = load_data(CANDIDATE_CVS_PATH)
-    cv_df_eng = cv_data.with_columns(
-        pl.col("CV_text_anon")
-        .map_elements(
-            lambda x: translate_text(x, target_language="en"), return_dtype=pl.String
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills `rate` tokens per second up to
+    `capacity`. acquire(n) blocks until n tokens are there; a request larger
+    than the capacity waits for a full bucket and leaves it in debt, so the
+    average rate still holds.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        # returns the seconds spent waiting
+        needed = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                elapsed = now - self.updated
+                self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+                self.updated = now
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+def make_batches(
+    texts: Sequence[str],
+    max_batch_size: int = MAX_BATCH_SIZE,
+    max_batch_chars: int = MAX_BATCH_CHARS,
+) -> List[List[int]]:
+    # indices of consecutive texts, within both limits (a longer text is sent
+    # alone)
+    batches: List[List[int]] = []
+    chars = 0
+    for i, text in enumerate(texts):
+        full = batches and (
+            len(batches[-1]) == max_batch_size or chars + len(text) > max_batch_chars
         )
-        .alias("Translated_CV")
+        if not batches or full:
+            batches.append([])
+            chars = 0
+        batches[-1].append(i)
+        chars += len(text)
+    return batches
+
+
+def chunk_spans(text: str, max_chars: Optional[int] = MAX_CHUNK_CHARS) -> List[Span]:
+    """
+    (start, end) offsets of consecutive chunks of the text, each at most
+    max_chars long. A chunk ends after the last sentence end that fits, else
+    after the last space, else at max_chars; None keeps the text whole. Blank
+    chunks (e.g. an empty text) are left out, as there is nothing to translate.
+    """
+    spans: List[Span] = []
+    start = 0
+    while max_chars is not None and len(text) - start > max_chars:
+        window = text[start : start + max_chars]
+        ends = [m.end() for m in SENTENCE_END.finditer(window)]
+        cut = ends[-1] if ends else window.rfind(" ") + 1 or max_chars
+        spans.append((start, start + cut))
+        start += cut
+    spans.append((start, len(text)))
+    return [(start, end) for start, end in spans if text[start:end].strip()]
+
+
+def join_chunks(translations: List[str]) -> Tuple[str, List[Span]]:
+    # the stripped translated chunks in order, one space apart, and their
+    # spans in the result ("" for no chunks)
+    parts = [t.strip() for t in translations]
+    spans = []
+    start = 0
+    for part in parts:
+        spans.append((start, start + len(part)))
+        start += len(part) + 1
+    return " ".join(parts), spans
+
+
+def trace_to_source(offsets: pl.DataFrame, row: Any, start: int, end: int) -> Span:
+    """
+    Span of the raw source text (e.g. CV_text_anon) translated into
+    Translated_CV[start:end] of one row: the union of the chunks the span
+    overlaps.
+    """
+    chunks = offsets.filter(
+        (pl.col("row") == row)
+        & (pl.col("translated_start") < max(end, start + 1))
+        & (pl.col("translated_end") > start)
     )
+    if chunks.is_empty():
+        raise ValueError(f"No chunk of row {row} overlaps [{start}, {end})")
+    source_start, source_end = chunks.select(
+        pl.col("source_start").min(), pl.col("source_end").max()
+    ).row(0)
+    return source_start, source_end
+
+
+class TranslationEngine:
+    """
+    Translates many CVs with one shared client: texts are cleaned, split into
+    chunks of at most `max_chunk_chars` at sentence boundaries, deduplicated
+    and packed into batches of up to `max_batch_size` texts and
+    `max_batch_chars` characters per API call, and batches run on
+    `max_concurrency` threads.
+
+    Optional token buckets cap requests and characters per minute.
+    Rate-limit (including 403 rateLimitExceeded), server and connection
+    errors are retried `max_retries` times
+    with exponential backoff and full jitter. `client_factory` builds the
+    client (anything with translate_v2's `translate(values, target_language=)`)
+    once, on first use. With a `cache`, stored chunk translations are skipped
+    and each batch is stored as soon as it is done.
+    """
+
+    def __init__(
+        self,
+        target_language: str = "en",
+        max_concurrency: int = 8,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_batch_chars: int = MAX_BATCH_CHARS,
+        max_chunk_chars: Optional[int] = MAX_CHUNK_CHARS,
+        requests_per_minute: Optional[float] = None,
+        chars_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        client_factory: Callable[[], Any] = translate.Client,
+        cache: Optional[TranslationCache] = None,
+    ) -> None:
+        self.target_language = target_language
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self.max_chunk_chars = max_chunk_chars
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.client_factory = client_factory
+        self.cache = cache
+        self.buckets: List[Callable[[List[str]], float]] = []
+        if requests_per_minute:
+            requests_bucket = TokenBucket(requests_per_minute / 60, max_concurrency)
+            self.buckets.append(lambda batch: requests_bucket.acquire(1))
+        if chars_per_minute:
+            chars_bucket = TokenBucket(chars_per_minute / 60, chars_per_minute)
+            self.buckets.append(
+                lambda batch: chars_bucket.acquire(sum(map(len, batch)))
+            )
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def translate_batch(self, batch: List[str]) -> List[str]:
+        for attempt in range(self.max_retries + 1):
+            for acquire in self.buckets:
+                acquire(batch)
+            try:
+                results = self.client.translate(
+                    batch, target_language=self.target_language
+                )
+                return [str(result["translatedText"]) for result in results]
+            except Exception as error:
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+        raise AssertionError("unreachable")
+
+    def translate_chunks(self, chunks: List[str]) -> Dict[str, str]:
+        # translation of every distinct chunk, from the cache or the API
+        keys = {chunk: text_key(chunk) for chunk in chunks}
+        translated: Dict[str, str] = {}
+        if self.cache is not None:
+            cached = self.cache.get_many(list(keys.values()), self.target_language)
+            translated = {
+                chunk: cached[key] for chunk, key in keys.items() if key in cached
+            }
+        missing = [chunk for chunk in keys if chunk not in translated]
+        batches = make_batches(missing, self.max_batch_size, self.max_batch_chars)
+
+        def store(future: Future) -> None:
+            done = dict(zip((missing[i] for i in futures.pop(future)), future.result()))
+            if self.cache is not None:
+                self.cache.put_many(
+                    ((keys[chunk], found) for chunk, found in done.items()),
+                    self.target_language,
+                )
+            translated.update(done)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(self.translate_batch, [missing[i] for i in batch]): batch
+                for batch in batches
+            }
+            # every finished batch is stored at once, so a rerun resumes there;
+            # on a failure the batches not started yet are dropped, and the
+            # ones that already finished are stored before raising
+            try:
+                for future in tqdm(
+                    as_completed(list(futures)), total=len(futures), desc="Translating"
+                ):
+                    store(future)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                for future in list(futures):
+                    if (
+                        future.done()
+                        and not future.cancelled()
+                        and future.exception() is None
+                    ):
+                        store(future)
+                raise
+        return translated
+
+    def translate_with_offsets(
+        self, texts: Sequence[str]
+    ) -> Tuple[List[str], pl.DataFrame]:
+        """
+        Translations of the texts, and the chunk-to-offset map: one row per
+        chunk with its `row` in texts, the span of the raw source text it
+        covers (`source_start`, `source_end`) and the span of its translation
+        in the result (`translated_start`, `translated_end`). Chunks are cut
+        from the cleaned text, and their spans mapped back to the raw one.
+        """
+        cleaned = [clean_cv_text_indexed(text) for text in texts]
+        spans = {text: chunk_spans(text, self.max_chunk_chars) for text, _ in cleaned}
+        translated = self.translate_chunks(
+            list(
+                dict.fromkeys(
+                    text[start:end]
+                    for text, text_spans in spans.items()
+                    for start, end in text_spans
+                )
+            )
+        )
+
+        results = []
+        offsets: List[Tuple[int, ...]] = []
+        for row, (text, index) in enumerate(cleaned):
+            source = spans[text]
+            result, targets = join_chunks(
+                [translated[text[start:end]] for start, end in source]
+            )
+            results.append(result)
+            # chunks are never empty, so end - 1 is their last character
+            offsets.extend(
+                (row, chunk, index[start], index[end - 1] + 1, *target_span)
+                for chunk, ((start, end), target_span) in enumerate(
+                    zip(source, targets)
+                )
+            )
+        return results, pl.DataFrame(offsets, schema=OFFSETS, orient="row")
+
+    def translate(self, texts: Sequence[str]) -> List[str]:
+        return self.translate_with_offsets(texts)[0]
+
+    def translate_series(self, texts: pl.Series) -> pl.Series:
+        # nulls stay null
+        present = texts.drop_nulls().to_list()
+        found = iter(self.translate(present))
+        return pl.Series(
+            texts.name,
+            [None if text is None else next(found) for text in texts],
+            dtype=pl.String,
+        )
+
+    def translate_frame(
+        self,
+        df: pl.DataFrame,
+        text_col: str = "CV_text_anon",
+        id_col: str = "CANDIDATE_ID",
+        out_col: str = "Translated_CV",
+    ) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        # df with out_col (null for null texts), and the offsets keyed by id_col
+        present = df.with_row_index("_row").filter(pl.col(text_col).is_not_null())
+        translations, offsets = self.translate_with_offsets(present[text_col].to_list())
+        translated = pl.Series(out_col, [None] * df.height, dtype=pl.String).scatter(
+            present["_row"], pl.Series(translations, dtype=pl.String)
+        )
+        offsets = offsets.select(
+            present[id_col].gather(offsets["row"]).alias(id_col), pl.exclude("row")
+        )
+        return df.with_columns(translated), offsets
+
+
+if __name__ == "__main__":
+    cv_data = load_data(CANDIDATE_CVS_PATH)
+    # rerunning after an interruption only translates the chunks not cached yet
+    engine = TranslationEngine(target_language="en", cache=TranslationCache())
+    cv_df_eng, offsets = engine.translate_frame(cv_data)
     cv_df_eng.write_csv("Candidate_CVs_translated.csv", separator=";")
+    offsets.write_csv("Candidate_CVs_translation_offsets.csv", separator=";")
     print("Translations completed e saved in Candidate_CVs_translated.csv")
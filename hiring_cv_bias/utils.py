@@ -1,4 +1,5 @@
-from typing import Dict, List
+import re
+from typing import Dict, List, Pattern
 
 import polars as pl
 
@@ -17,3 +18,44 @@ def filter_unknown_and_other_rows(
     cv_df = cv_df.filter(pl.col("Gender").is_in(["Male", "Female"]))
     cv_df = cv_df.filter(pl.col("Age_bucket").is_in(["25-34", "45-54", "55-74"]))
     return cv_df
+
+
+_RUST_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+_UNSUPPORTED = re.compile(r"\(\?<?[=!]|\(\?P=|\\[1-9]")  # lookarounds, backrefs
+
+
+def to_rust_regex(pattern: Pattern[str]) -> str:
+    # Polars' str.contains / str.extract_all run on Rust's regex crate: carry the
+    # Python flags over as inline flags and refuse what Rust cannot express
+    if _UNSUPPORTED.search(pattern.pattern):
+        raise ValueError(f"Pattern not supported by Rust regex: {pattern.pattern!r}")
+    flags = "".join(f for flag, f in _RUST_FLAGS.items() if pattern.flags & flag)
+    return f"(?{flags}){pattern.pattern}" if flags else pattern.pattern
+
+
+def python_word_chars(text: pl.Expr) -> pl.Expr:
+    # Rust's `\w` also covers marks, joiners, connector punctuation and
+    # other-alphabetic symbols, Python's also covers "other" numbers (², ½); \x1c-\x1f
+    # are whitespace only in Python and "ı" equals "i" under Python's IGNORECASE.
+    # Rewriting those characters lets `\b`, `\w`, `\s` behave the same in both.
+    return (
+        text.str.replace_all(
+            r"[\p{M}\p{Join_Control}\p{Other_Alphabetic}[\p{Pc}--_]]", "\x00"
+        )
+        .str.replace_all(r"\p{No}", "0")
+        .str.replace_all(r"[\x1c-\x1f]", " ")
+        .str.replace_all("ı", "i", literal=True)
+    )
+
+
+# every character str.isspace() accepts: Rust's \s plus \x1c-\x1f
+PYTHON_WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+    + "".join(chr(c) for c in range(0x2000, 0x200B))
+    + "\u2028\u2029\u202f\u205f\u3000"
+)
+
+
+def python_strip(text: pl.Expr) -> pl.Expr:
+    # str.strip() without a regex
+    return text.str.strip_chars(PYTHON_WHITESPACE)
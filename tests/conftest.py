@@ -0,0 +1,131 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import translate_v2 as translate
+
+# what the stub does with a request: an HTTP status, a (status, reason) error,
+# "drop" (close the connection without answering) or "partial" (close it
+# mid-response)
+Action = Union[int, str, Tuple[int, str]]
+
+
+def stub_translation(text: str) -> str:
+    # same length, so offsets can be checked against the source
+    return text.upper()
+
+
+class StubTranslationServer:
+    """
+    Local stand-in for the Cloud Translation v2 REST endpoint. Answers with
+    stub_translation of every segment, after `delay` seconds, unless the next
+    scripted action says otherwise (`fail_next`, or `fail_always` for every
+    request). Records the action taken for every request, the segments of the
+    successful ones and the peak number of requests in flight.
+    """
+
+    def __init__(self) -> None:
+        self.requests: List[List[str]] = []
+        self.actions: List[Action] = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.script: List[Action] = []
+        self.always: Action = 200
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def fail_next(self, *actions: Action) -> None:
+        self.script.extend(actions)
+
+    def fail_always(self, action: Action) -> None:
+        self.always = action
+
+    @property
+    def segments(self) -> List[str]:
+        return [segment for request in self.requests for segment in request]
+
+    def client_factory(self) -> Callable[[], translate.Client]:
+        # the real google-cloud client, pointed at the stub
+        return lambda: translate.Client(
+            credentials=AnonymousCredentials(),
+            client_options={"api_endpoint": self.url},
+        )
+
+    def handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    action = stub.script.pop(0) if stub.script else stub.always
+                    stub.actions.append(action)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                    if action == 200:
+                        stub.requests.append(body["q"])
+
+                if action == "drop":
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                if action == "partial":
+                    self.send_response(200)
+                    self.send_header("Content-Length", "1000")
+                    self.end_headers()
+                    self.wfile.write(b'{"data"')
+                    self.wfile.flush()
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                payload: Dict[str, Any]
+                status, reason = action if isinstance(action, tuple) else (action, "")
+                if status == 200:
+                    translations = [
+                        {"translatedText": stub_translation(q)} for q in body["q"]
+                    ]
+                    payload = {"data": {"translations": translations}}
+                else:
+                    payload = {"error": {"code": status, "message": "stub"}}
+                    if reason:
+                        payload["error"]["errors"] = [
+                            {
+                                "reason": reason,
+                                "message": "stub",
+                                "domain": "usageLimits",
+                            }
+                        ]
+                data = json.dumps(payload).encode()
+                self.send_response(int(status))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubTranslationServer]:
+    server = StubTranslationServer()
+    yield server
+    server.close()
@@ -0,0 +1,61 @@
+import itertools
+import random
+
+import numpy as np
+import polars as pl
+
+from hiring_cv_bias.cleaning.dedup import (
+    bucket_pairs,
+    duplicate_ids_to_drop,
+    find_near_duplicates,
+    minhash_signatures,
+    near_duplicate_pairs,
+)
+
+
+def expected_bucket_pairs(key, max_bucket_size):
+    pairs = set()
+    for value in set(key.tolist()):
+        members = np.flatnonzero(key == value).tolist()
+        if len(members) <= max_bucket_size:
+            pairs |= set(itertools.combinations(members, 2))
+        else:
+            pairs |= {(members[0], other) for other in members[1:]}
+    return pairs
+
+
+def test_bucket_pairs_lists_every_pair_up_to_the_cap():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        key = rng.integers(0, rng.integers(1, 30), rng.integers(0, 80))
+        key = key.astype(np.uint64)
+        cap = int(rng.integers(2, 10))
+        found = {tuple(sorted(pair)) for pair in bucket_pairs(key, cap).tolist()}
+        assert found == expected_bucket_pairs(key, cap)
+
+
+def test_dissimilar_bucket_member_does_not_hide_duplicates():
+    # 0 and 2 are duplicates, 1 shares their band key but not the rest
+    signatures = np.array([[1, 1, 5, 5], [1, 1, 6, 7], [1, 1, 5, 5]], dtype=np.uint32)
+    pairs = near_duplicate_pairs(signatures, threshold=0.8, bands=2)
+    assert pairs.tolist() == [[0, 2]]
+
+
+def test_near_duplicates_are_clustered():
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(500)]
+    base = [" ".join(rng.choices(vocab, k=80)) for _ in range(20)]
+    edited = [text.replace(text.split()[40], "edited", 1) for text in base]
+    df = pl.DataFrame(
+        {"CANDIDATE_ID": range(40), "CV_text_anon": base + edited},
+    )
+    clusters = find_near_duplicates(df)
+    assert clusters.height == 40
+    assert (clusters["cluster_size"] == 2).all()
+    assert sorted(duplicate_ids_to_drop(clusters)) == list(range(20, 40))
+
+
+def test_texts_without_words_get_empty_signatures():
+    signatures = minhash_signatures(pl.Series(["", "  ", "a b c"]), num_perm=8)
+    assert (signatures[:2] == np.iinfo(np.uint32).max).all()
+    assert (signatures[2] != np.iinfo(np.uint32).max).all()
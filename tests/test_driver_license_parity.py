@@ -0,0 +1,73 @@
+import random
+
+import polars as pl
+import pytest
+
+from hiring_cv_bias.bias_detection.rule_based.evaluation.benchmark import (
+    driver_license_parity,
+)
+
+# pattern words, separators and the characters where Rust's \w / \s / case
+# folding differ from Python's: joiners, marks, "other" numbers, \x1c-\x1f,
+# dotted/dotless i, connector punctuation
+TOKENS = [
+    "driver",
+    "drivers",
+    "driver's",
+    "driver’s",
+    "driving",
+    "licensed",
+    "license",
+    "licence",
+    "car",
+    "category",
+    "type",
+    "own",
+    "b",
+    "am",
+    "c1",
+    "be",
+    "ce",
+    "a",
+    ":",
+    "-",
+    ",",
+    "/",
+    " ",
+    "  ",
+    "\n",
+    "\t",
+    "‍",
+    "‌",
+    "́",
+    "²",
+    "½",
+    "\x1c",
+    "\x1f",
+    "\x85",
+    "\xa0",
+    "İ",
+    "ı",
+    "K",
+    "‿",
+    "_",
+    "x",
+]
+
+
+def adversarial_texts(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(TOKENS, k=rng.randint(1, 12))) for _ in range(n)]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["licensed‍driver", "licensed²driver", "driver\x1clicense", "Driving License B"],
+)
+def test_known_divergences_match(text):
+    assert driver_license_parity(pl.Series([text])).is_empty()
+
+
+def test_python_and_native_driver_license_agree():
+    mismatches = driver_license_parity(pl.Series(adversarial_texts(50_000)))
+    assert mismatches.is_empty(), mismatches.head(10)
@@ -0,0 +1,100 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from hiring_cv_bias.bias_detection.fuzzy.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+def fake_encode(texts):
+    # a fixed vector per exact text, so tests can tell which spelling was encoded
+    return np.stack(
+        [
+            np.frombuffer(hashlib.sha256(text.encode()).digest()[:DIM], np.uint8)
+            for text in texts
+        ]
+    ).astype(np.float32)
+
+
+def make_cache(cache_dir, encode=fake_encode, **kwargs):
+    return EmbeddingCache("stub/model", encode, cache_dir=str(cache_dir), **kwargs)
+
+
+def fill(cache_dir, texts):
+    make_cache(cache_dir).encode(texts)
+
+
+def test_vectors_are_reused_across_instances(tmp_path):
+    texts = [f"skill {i}" for i in range(20)]
+    expected = make_cache(tmp_path).encode(texts)
+    calls = []
+    cache = make_cache(
+        tmp_path, lambda texts: calls.append(texts) or fake_encode(texts)
+    )
+    np.testing.assert_array_equal(cache.encode(texts), expected)
+    assert calls == []
+
+
+def test_the_original_text_is_encoded(tmp_path):
+    calls = []
+    cache = make_cache(
+        tmp_path, lambda texts: calls.append(texts) or fake_encode(texts)
+    )
+    vectors = cache.encode(["Customer  Service ", "customer service", "SQL"])
+    assert calls == [["Customer  Service ", "SQL"]]
+    np.testing.assert_array_equal(vectors[0], vectors[1])
+    np.testing.assert_array_equal(vectors[0], fake_encode(["Customer  Service "])[0])
+    assert "CUSTOMER SERVICE" in cache
+
+
+def test_interleaved_writers_keep_each_others_rows(tmp_path):
+    first, second = make_cache(tmp_path), make_cache(tmp_path)
+    first.encode(["a", "b"])
+    # second read the store before first wrote to it
+    second.encode(["c", "a"])
+    first.encode(["d"])
+
+    cache = make_cache(tmp_path)
+    assert len(cache) == 4
+    texts = ["a", "b", "c", "d"]
+    np.testing.assert_array_equal(cache.encode(texts), fake_encode(texts))
+
+
+@pytest.mark.parametrize("precision", ["float32", "int8"])
+def test_concurrent_processes_fill_one_store(tmp_path, precision):
+    texts = [f"skill {i}" for i in range(400)]
+    chunks = [texts[i::4] + texts[:50] for i in range(4)]
+    if precision != "float32":
+        tmp_path = tmp_path / precision
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=fill_at, args=(tmp_path, chunk, precision))
+        for chunk in chunks
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    calls = []
+    cache = make_cache(
+        tmp_path,
+        lambda texts: calls.append(texts) or fake_encode(texts),
+        precision=precision,
+    )
+    assert len(cache) == len(texts)
+    expected = EmbeddingCache(
+        "reference", fake_encode, cache_dir=None, precision=precision
+    ).encode(texts)
+    np.testing.assert_array_equal(cache.encode(texts), expected)
+    assert calls == []
+
+
+def fill_at(cache_dir, texts, precision):
+    cache = make_cache(cache_dir, precision=precision)
+    for start in range(0, len(texts), 7):
+        cache.encode(texts[start : start + 7])
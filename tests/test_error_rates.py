@@ -0,0 +1,122 @@
+import polars as pl
+import pytest
+
+from hiring_cv_bias.bias_detection.rule_based.evaluation.compare_parser import (
+    compute_candidate_coverage,
+    error_rates_by_group,
+)
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import (
+    ROW,
+    Conf,
+    Result,
+)
+
+SOURCE = pl.DataFrame(
+    {
+        ROW: [0, 1, 2, 3],
+        "CANDIDATE_ID": [1, 2, 3, 4],
+        "Gender": ["Female", "Male", "Female", "Male"],
+    },
+    schema={ROW: pl.UInt32, "CANDIDATE_ID": pl.Int64, "Gender": pl.String},
+)
+
+# candidate 1 has two CVs, with different skills found in each
+DF_CV = pl.DataFrame(
+    {
+        "CANDIDATE_ID": [1, 1, 2],
+        "Gender": ["Female", "Female", "Male"],
+        "Location": ["north", "north", "south"],
+        "length": [1, 2, 3],
+        "Translated_CV": ["python", "excel,sql", "java"],
+        "CV_text_anon": ["it-python", "it-excel,sql", "it-java"],
+    }
+)
+DF_PARSER = pl.DataFrame(
+    {
+        "CANDIDATE_ID": [1, 1, 2],
+        "Skill_Type": ["IT_Skill"] * 3,
+        "Skill": ["Python", "SQL", "Java"],
+    }
+)
+
+
+def confusion(ids):
+    return pl.DataFrame(
+        {
+            "CANDIDATE_ID": ids,
+            ROW: [i - 1 for i in ids],
+            "skill": ["x"] * len(ids),
+            "reason": [""] * len(ids),
+        },
+        schema={
+            "CANDIDATE_ID": pl.Int64,
+            ROW: pl.UInt32,
+            "skill": pl.String,
+            "reason": pl.String,
+        },
+    )
+
+
+def make_result(source):
+    return Result(
+        Conf(3, 2, 1, 1),
+        tp=confusion([1, 1, 2]),
+        fp=confusion([2, 3]),
+        fn=confusion([4]),
+        tn=confusion([3]),
+        source=source,
+    )
+
+
+def counts(df):
+    return {
+        row["Gender"]: (row["tp"], row["fp"], row["fn"], row["tn"])
+        for row in df.iter_rows(named=True)
+    }
+
+
+def test_counts_per_group():
+    rates = error_rates_by_group(make_result(SOURCE), SOURCE, "Male")
+    assert counts(rates) == {"Female": (2, 1, 0, 1), "Male": (1, 1, 1, 0)}
+
+
+def test_population_labels_of_duplicated_candidates_are_counted_once():
+    population = pl.concat([SOURCE, SOURCE.head(2)]).drop(ROW)
+    rates = error_rates_by_group(make_result(SOURCE.drop("Gender")), population, "Male")
+    assert counts(rates) == {"Female": (2, 1, 0, 1), "Male": (1, 1, 1, 0)}
+
+
+def test_conflicting_population_labels_are_rejected():
+    conflicting = pl.concat(
+        [SOURCE.drop(ROW), pl.DataFrame({"CANDIDATE_ID": [1], "Gender": ["Male"]})]
+    )
+    with pytest.raises(ValueError):
+        error_rates_by_group(make_result(SOURCE.drop("Gender")), conflicting, "Male")
+
+
+def coverage():
+    return compute_candidate_coverage(
+        DF_CV, DF_PARSER, "IT_Skill", lambda t: set(t.split(",")), verbose=False
+    )
+
+
+def test_rows_pair_each_skill_with_its_own_cv():
+    result = coverage()
+    view = ["CANDIDATE_ID", "skill", "cv_text", "cv_italian"]
+    assert sorted(result.tp_rows.select(view).rows()) == [
+        (1, "python", "python", "it-python"),
+        (1, "sql", "excel,sql", "it-excel,sql"),
+        (2, "java", "java", "it-java"),
+    ]
+    assert sorted(result.fp_rows.select(view).rows()) == [
+        (1, "python", "excel,sql", "it-excel,sql"),
+        (1, "sql", "python", "it-python"),
+    ]
+    assert result.fn_rows.select(view).rows() == [
+        (1, "excel", "excel,sql", "it-excel,sql")
+    ]
+
+
+def test_group_counts_follow_each_cv():
+    rates = error_rates_by_group(coverage(), DF_CV, "Male")
+    assert counts(rates) == {"Female": (2, 2, 1, 0), "Male": (1, 0, 0, 0)}
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from hiring_cv_bias.bias_detection.fuzzy.ann import IVFIndex, unit_rows
+
+DIM = 32
+
+
+def clustered(n, n_clusters=40, seed=0):
+    # label-like embeddings: groups of nearby vectors
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, DIM))
+    return centers[rng.integers(n_clusters, size=n)] + rng.normal(
+        scale=0.4, size=(n, DIM)
+    )
+
+
+def labels(n):
+    return [f"label {i}" for i in range(n)]
+
+
+def recall(found, expected):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)])
+
+
+def test_recall_against_brute_force():
+    vectors = clustered(3000)
+    queries = clustered(200, seed=1)
+    index = IVFIndex.build(vectors, labels(len(vectors)), n_lists=50, n_probe=8)
+
+    # brute force on the original vectors, mapped to the index rows by label
+    row_of = {label: row for row, label in enumerate(index.labels)}
+    scores = unit_rows(queries) @ unit_rows(vectors).T
+    expected = [[row_of[f"label {i}"] for i in np.argsort(-s)[:10]] for s in scores]
+
+    _, rows = index.search(queries, k=10)
+    assert recall(rows, expected) >= 0.9
+
+    # probing every list is the exhaustive search
+    _, rows = index.search(queries, k=10, n_probe=index.n_lists)
+    assert recall(rows, expected) == 1.0
+
+
+def test_scores_are_sorted_cosines():
+    vectors = clustered(500)
+    index = IVFIndex.build(vectors, labels(len(vectors)), n_lists=20)
+    queries = clustered(20, seed=2)
+    scores, rows = index.search(queries, k=5)
+    assert (np.diff(scores, axis=1) <= 0).all()
+    np.testing.assert_allclose(
+        scores,
+        np.einsum("qd,qkd->qk", unit_rows(queries), index.vectors[rows]),
+        rtol=1e-5,
+        atol=1e-6,
+    )
+
+
+def test_fewer_vectors_than_lists():
+    vectors = clustered(5)
+    index = IVFIndex.build(vectors, labels(5), n_lists=16, n_probe=16)
+    assert index.n_lists == 5
+    assert index.offsets[-1] == 5
+
+    scores, rows = index.search(vectors[:2], k=8)
+    # every vector is found once, the missing ones are row -1
+    assert [sorted(r[r >= 0]) for r in rows] == [list(range(5))] * 2
+    assert (rows[:, 5:] == -1).all() and np.isneginf(scores[:, 5:]).all()
+
+    hits = index.query(vectors[:1], k=8)[0]
+    assert len(hits) == 5
+    assert hits[0][0] == "label 0"
+    assert hits[0][1] == pytest.approx(1.0)
+
+
+def test_no_vectors():
+    with pytest.raises(ValueError):
+        IVFIndex.build(np.empty((0, DIM)), [])
+
+
+def test_identical_vectors_leave_lists_empty():
+    vectors = np.ones((10, DIM))
+    index = IVFIndex.build(vectors, labels(10), n_lists=4, n_probe=4)
+    assert index.offsets[-1] == 10
+    _, rows = index.search(vectors[:1], k=3)
+    assert (rows >= 0).all()
+
+
+def test_save_and_load(tmp_path):
+    vectors = clustered(300)
+    index = IVFIndex.build(vectors, labels(300), n_lists=10, n_probe=3)
+    index.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+    queries = clustered(10, seed=3)
+    assert loaded.query(queries, k=4) == index.query(queries, k=4)
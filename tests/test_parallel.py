@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from hiring_cv_bias import parallel
+from hiring_cv_bias.bias_detection.rule_based.evaluation import benchmark
+from hiring_cv_bias.parallel import parallel_map
+
+_initialized_in = None
+
+
+def mark_worker():
+    global _initialized_in
+    _initialized_in = os.getpid()
+
+
+def square_with_pid(x):
+    return x * x, os.getpid(), _initialized_in
+
+
+@pytest.fixture(autouse=True)
+def no_progress_bar(monkeypatch):
+    monkeypatch.setattr(parallel, "tqdm", lambda items, **kwargs: items)
+
+
+def test_results_keep_input_order():
+    found = parallel_map(square_with_pid, range(1000), n_workers=3, chunk_size=7)
+    assert [square for square, _, _ in found] == [x * x for x in range(1000)]
+
+
+def test_the_initializer_runs_in_every_worker():
+    found = parallel_map(
+        square_with_pid, range(100), n_workers=2, chunk_size=5, initializer=mark_worker
+    )
+    assert all(pid == initialized for _, pid, initialized in found)
+    assert os.getpid() not in {pid for _, pid, _ in found}
+
+
+def test_one_worker_runs_in_process():
+    found = parallel_map(square_with_pid, range(10), chunk_size=2)
+    assert {pid for _, pid, _ in found} == {os.getpid()}
+
+
+def test_chunks_need_a_worker():
+    with pytest.raises(RuntimeError):
+        parallel._run_chunk([1])
+
+
+def test_benchmark_rejects_changed_results(monkeypatch):
+    # a parallel run that disagrees with the serial one fails the benchmark,
+    # also under python -O
+    monkeypatch.setattr(
+        benchmark, "parallel_map", lambda fn, texts, **_: [set()] * len(texts)
+    )
+    with pytest.raises(RuntimeError):
+        benchmark.benchmark_parallel_extraction(["english b2"], lambda t: {"en"}, [1])
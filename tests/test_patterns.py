@@ -0,0 +1,147 @@
+import os
+import random
+import re
+
+import pytest
+
+from hiring_cv_bias.bias_detection.fuzzy import occupations
+from hiring_cv_bias.bias_detection.rule_based import patterns
+from hiring_cv_bias.bias_detection.rule_based.scanners import JobTitleMatcher
+
+TITLES = [
+    "data analyst",
+    "senior data analyst",
+    "data",
+    "analyst",
+    "cook",
+    "head cook",
+    "sales assistant",
+    "assistant",
+    "c++ developer",
+]
+JOB_WORDS = ["data", "analyst", "senior", "head", "cook", "sales", "assistant"]
+JOB_WORDS += ["c++", "developer", "cooks", "dataset", "the", "a"]
+
+LANGUAGE_VARIANTS = {
+    "en": {"english", "inglese"},
+    "it": {"italian", "italiano"},
+    "fr": {"french"},
+    "de": {"german", "deutsch"},
+    "zh": {"chinese", "mandarin chinese"},
+}
+LANGUAGE_WORDS = [*{v for vs in LANGUAGE_VARIANTS.values() for v in vs}]
+LANGUAGE_WORDS += ["native", "speaker", "nativespeaker", "of", "the", "language"]
+LANGUAGE_WORDS += ["languages", "knowledge", "proficiency", "in", "certification"]
+LANGUAGE_WORDS += ["spoken", "written", "oral", "b2", "c1", "englishc1", "mandarin"]
+
+SEPARATORS = [" ", "  ", ", ", ".", "\n", "-", "_", "/", "(", ")"]
+
+
+def random_texts(words, n=300, seed=0):
+    rng = random.Random(seed)
+    return [
+        "".join(
+            rng.choice(words) + rng.choice(SEPARATORS)
+            for _ in range(rng.randint(0, 12))
+        )
+        for _ in range(n)
+    ]
+
+
+def test_job_title_matcher_matches_the_alternation():
+    # jobs_pattern as built before the matcher
+    pattern = re.compile("|".join(rf"\b{re.escape(job)}\b" for job in TITLES))
+    matcher = JobTitleMatcher(TITLES)
+    for text in random_texts(JOB_WORDS):
+        assert [m.span() for m in matcher.finditer(text)] == [
+            m.span() for m in pattern.finditer(text)
+        ]
+        assert matcher.findall(text) == pattern.findall(text)
+
+
+def test_language_scanner_matches_the_regexes(monkeypatch):
+    monkeypatch.setattr(patterns, "LANGUAGE_VARIANTS", LANGUAGE_VARIANTS, raising=False)
+    regexes = patterns._language_regexes()
+    scanner = patterns._language_scanner()
+    for text in random_texts(LANGUAGE_WORDS):
+        text = text.lower()
+        assert scanner.scan(text) == {
+            lang for lang, rx in regexes.items() if rx.search(text)
+        }
+        assert {code for code, _, _ in scanner.spans(text)} == scanner.scan(text)
+
+
+# --- registry ---
+
+JOBS_CSV = 'conceptUri,preferredLabel,altLabels\nu0,cook,"chef\nhead cook"\nu1,waiter/waitress,""\n'
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # the registry on a small jobs csv and an empty cache, counting the builds
+    jobs_path = tmp_path / "occupations.csv"
+    jobs_path.write_text(JOBS_CSV, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(patterns, "JOBS_PATH", str(jobs_path))
+    monkeypatch.setattr(patterns, "CACHE_DIR", str(cache_dir))
+
+    builds = {"jobs": 0, "languages": 0}
+
+    def build_records(path):
+        builds["jobs"] += 1
+        return real_build_records(path)
+
+    def build_language_variants():
+        builds["languages"] += 1
+        return LANGUAGE_VARIANTS
+
+    real_build_records = occupations.build_records
+    monkeypatch.setattr(occupations, "build_records", build_records)
+    monkeypatch.setattr(patterns, "build_language_variants", build_language_variants)
+
+    patterns.reset()
+    yield jobs_path, cache_dir, builds
+    patterns.reset()
+
+
+def test_artifacts_are_built_once(registry):
+    _, cache_dir, builds = registry
+    matcher = patterns.jobs_matcher
+    scanner = patterns.language_scanner
+    patterns.warm()
+    assert patterns.jobs_matcher is matcher
+    assert patterns.language_scanner is scanner
+    assert patterns.normalized_jobs == ["cook", "waiter", "waitress"]
+    assert builds == {"jobs": 1, "languages": 1}
+
+    # a new process: the artifacts are read back from the cache
+    patterns.reset()
+    assert patterns.normalized_jobs == ["cook", "waiter", "waitress"]
+    assert patterns.LANGUAGE_VARIANTS == LANGUAGE_VARIANTS
+    assert builds == {"jobs": 1, "languages": 1}
+    assert len(os.listdir(cache_dir)) == 3  # patterns json, jobs trie and json
+
+
+def test_changed_jobs_csv_invalidates_the_cache(registry):
+    jobs_path, _, builds = registry
+    assert "plumber" not in patterns.normalized_jobs
+
+    jobs_path.write_text(JOBS_CSV + 'u2,plumber,""\n', encoding="utf-8")
+    patterns.reset()
+    assert patterns.normalized_jobs == ["cook", "plumber", "waiter", "waitress"]
+    assert patterns.jobs_matcher.find_titles("plumber and cook") == {"plumber", "cook"}
+    assert builds["jobs"] == 2
+
+
+def test_new_package_versions_invalidate_the_cache(registry, monkeypatch):
+    _, _, builds = registry
+    patterns.warm("LANGUAGE_VARIANTS")
+    monkeypatch.setattr(patterns, "version", lambda pkg: "0.0.0")
+    patterns.reset()
+    patterns.warm("LANGUAGE_VARIANTS")
+    assert builds["languages"] == 2
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        patterns.not_an_artifact
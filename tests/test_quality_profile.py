@@ -0,0 +1,54 @@
+import polars as pl
+import pytest
+
+from hiring_cv_bias.cleaning.benchmark import make_synthetic_cv_frame
+from hiring_cv_bias.cleaning.raw_cv import (
+    QUALITY_SIGNALS,
+    add_length_column,
+    assess_translation_completeness,
+    detect_corrupted_cvs,
+    detect_repetitive_cvs,
+    detect_vocab_sparsity,
+    filter_placeholder_tails,
+    profile_cvs,
+)
+
+
+def separate_checks(df, text_cols):
+    flagged = [
+        add_length_column(df, text_cols["length"]).filter(pl.col("len_anon") < 300),
+        detect_repetitive_cvs(df, text_cols["repetition"], max_repetition=0.5),
+        detect_vocab_sparsity(df, text_cols["vocabulary"], min_words=30, min_ttr=0.3),
+        filter_placeholder_tails(df, text_cols["placeholder"], char="X", min_run=20),
+        detect_corrupted_cvs(df, text_cols["corrupted"], max_unusual_frac=0.02),
+        assess_translation_completeness(df, text_cols["translation"]).filter(
+            pl.col("len_ratio") < 0.7
+        ),
+    ]
+    return set().union(*(f["CANDIDATE_ID"] for f in flagged))
+
+
+@pytest.mark.parametrize(
+    "text_cols",
+    [
+        {},
+        {"vocabulary": "Other_CV", "placeholder": "Other_CV", "length": "Other_CV"},
+    ],
+)
+def test_profile_drops_the_cvs_of_the_separate_checks(text_cols):
+    df = make_synthetic_cv_frame(500, n_distinct=200)
+    # full translations, so that the other rules decide which CVs go
+    df = df.with_columns(
+        Translated_CV=pl.col("CV_text_anon"),
+        Other_CV=pl.col("CV_text_anon").shuffle(seed=1),
+    )
+    profile = profile_cvs(df, text_cols=text_cols)
+
+    columns = {s: text_cols.get(s, "CV_text_anon") for s in QUALITY_SIGNALS}
+    assert set(profile.filter("drop")["CANDIDATE_ID"]) == separate_checks(df, columns)
+
+
+def test_unknown_signal_is_rejected():
+    df = make_synthetic_cv_frame(10)
+    with pytest.raises(ValueError):
+        profile_cvs(df, text_cols={"words": "Translated_CV"})
@@ -0,0 +1,158 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from hiring_cv_bias.bias_detection.fuzzy.matcher import SemanticMatcher
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import Conf
+
+DIM = 16
+THRESHOLDS = [0.0, 0.3, 0.5, 0.7, 0.9]
+SKILLS = [f"skill {i}" for i in range(40)]
+
+
+class StubEncoder:
+    # skills in the same group of 5 share a direction, so similarities cover
+    # the whole range of thresholds
+    def __init__(self) -> None:
+        rng = np.random.default_rng(0)
+        groups = rng.normal(size=(len(SKILLS) // 5, DIM))
+        self.vectors = {
+            skill: groups[i // 5] + rng.normal(scale=0.6, size=DIM)
+            for i, skill in enumerate(SKILLS)
+        }
+
+    def encode(self, texts, convert_to_numpy=True):
+        return np.stack([self.vectors[t] for t in texts]).astype(np.float32)
+
+
+def make_matcher(precision="float32"):
+    return SemanticMatcher(
+        "stub/model", cache_dir=None, precision=precision, model=StubEncoder()
+    )
+
+
+def make_corpus(n=60, seed=0):
+    rng = random.Random(seed)
+    custom = [set(rng.sample(SKILLS, rng.randint(0, 6))) for _ in range(n)]
+    parser = [set(rng.sample(SKILLS, rng.randint(0, 6))) for _ in range(n)]
+    # shared skills, as when both sides name the same one
+    for c, p in zip(custom[::3], parser[::3]):
+        p.update(list(c)[:2])
+    return custom, parser
+
+
+def brute_force(encoder, custom, parser, threshold):
+    # the per-candidate loop with util.cos_sim that the batch API replaced
+    if not custom or not parser:
+        return set(custom)
+    custom_list, parser_list = list(custom), list(parser)
+    a = torch.from_numpy(encoder.encode(custom_list))
+    b = torch.from_numpy(encoder.encode(parser_list))
+    similarities = torch.nn.functional.normalize(a) @ (
+        torch.nn.functional.normalize(b).T
+    )
+    matches = similarities >= threshold
+    custom_matches = {s for s, m in zip(custom_list, matches.any(dim=1)) if m}
+    parser_matches = {s for s, m in zip(parser_list, matches.any(dim=0)) if m}
+    return (custom - custom_matches) | parser_matches
+
+
+def brute_force_conf(encoder, custom_skills, parser_skills, threshold):
+    tp = fp = tn = fn = 0
+    for custom, parser in zip(custom_skills, parser_skills):
+        adjusted = brute_force(encoder, custom, parser, threshold)
+        tp += len(adjusted & parser)
+        fp += len(parser - adjusted)
+        fn += len(adjusted - parser)
+        tn += not adjusted and not parser
+    return Conf(tp, fp, tn, fn)
+
+
+def test_sweep_matches_the_per_candidate_loop():
+    matcher = make_matcher()
+    custom, parser = make_corpus()
+    sweep = matcher.semantic_comparison_sweep(custom, parser, THRESHOLDS)
+    for threshold in THRESHOLDS:
+        assert sweep[threshold] == [
+            brute_force(matcher.model, c, p, threshold) for c, p in zip(custom, parser)
+        ]
+
+
+def test_threshold_sweep_counts_match_the_per_candidate_loop():
+    matcher = make_matcher()
+    custom, parser = make_corpus()
+    confs = matcher.threshold_sweep(custom, parser, THRESHOLDS)
+    for threshold in THRESHOLDS:
+        assert confs[threshold] == brute_force_conf(
+            matcher.model, custom, parser, threshold
+        )
+
+
+def test_small_blocks_give_the_same_sweep():
+    matcher = make_matcher()
+    custom, parser = make_corpus()
+    assert matcher.semantic_comparison_sweep(
+        custom, parser, THRESHOLDS, batch_size=4
+    ) == matcher.semantic_comparison_sweep(custom, parser, THRESHOLDS)
+
+
+@pytest.mark.parametrize(
+    "precision, tolerance",
+    [
+        ("float16", 2 * np.sqrt(DIM) * 2.0**-11),
+        # rounding every component to 1 / 127 moves a unit vector by at most
+        # sqrt(DIM) / 254, and a cosine by twice that
+        ("int8", 2 * np.sqrt(DIM) / 254),
+    ],
+)
+def test_reduced_precision_scores_are_close(precision, tolerance):
+    custom, parser = make_corpus()
+    reference = make_matcher().best_similarities(custom, parser)
+    reduced = make_matcher(precision).best_similarities(custom, parser)
+    for ref, found in zip(reference, reduced):
+        assert (ref is None) == (found is None)
+        if ref is None:
+            continue
+        assert (ref.custom, ref.parser) == (found.custom, found.parser)
+        np.testing.assert_allclose(found.custom_best, ref.custom_best, atol=tolerance)
+        np.testing.assert_allclose(found.parser_best, ref.parser_best, atol=tolerance)
+
+
+def test_precision_report():
+    matcher = make_matcher()
+    custom, parser = make_corpus()
+    report = matcher.precision_report(custom, parser, THRESHOLDS)
+    assert report.height == 3 * len(THRESHOLDS)
+
+    reference = report.filter(dtype="float32")
+    assert reference["flips"].sum() == 0
+    assert reference["max_abs_error"].max() == 0.0
+
+    n_decisions = sum(len(c) + len(p) for c, p in zip(custom, parser) if c and p)
+    assert (report["decisions"] == n_decisions).all()
+
+    def decisions(precision, threshold):
+        best = make_matcher(precision).best_similarities(custom, parser)
+        return np.concatenate(
+            [
+                v >= threshold
+                for sims in best
+                if sims is not None
+                for v in (sims.custom_best, sims.parser_best)
+            ]
+        )
+
+    for precision in ("float32", "float16", "int8"):
+        rows = report.filter(dtype=precision).sort("threshold")
+        assert rows["flips"].to_list() == [
+            int((decisions(precision, t) != decisions("float32", t)).sum())
+            for t in THRESHOLDS
+        ]
+        confs = matcher.with_precision(precision).threshold_sweep(
+            custom, parser, THRESHOLDS
+        )
+        assert rows.select("tp", "fp", "tn", "fn").rows() == [
+            (c.tp, c.fp, c.tn, c.fn) for c in (confs[t] for t in THRESHOLDS)
+        ]
@@ -0,0 +1,88 @@
+import polars as pl
+
+from hiring_cv_bias.bias_detection.rule_based.evaluation.compare_parser import (
+    compute_candidate_coverage,
+    extract_skills,
+)
+from hiring_cv_bias.bias_detection.rule_based.evaluation.metrics import SPANS_COLUMN
+from hiring_cv_bias.bias_detection.rule_based.extractors import (
+    driver_license_spans,
+    extract_driver_license,
+    spans_from_json,
+    spans_to_json,
+)
+from hiring_cv_bias.bias_detection.rule_based.patterns import (
+    language_left_context_rev,
+    language_right_context,
+)
+from hiring_cv_bias.bias_detection.rule_based.scanners import LanguageScanner
+
+TEXTS = [
+    "Driving license B, own car.",
+    "Warehouse worker, no licence.",
+    None,
+    "category license c1 and B driving license",
+]
+
+
+def test_skills_are_the_span_labels():
+    found = extract_skills(pl.Series(TEXTS), span_extractor=driver_license_spans)
+    expected = [extract_driver_license(t) if t else set() for t in TEXTS]
+    assert [set(skills) for skills in found["truth"]] == expected
+    assert [len(spans) for spans in found[SPANS_COLUMN]] == [2, 0, 0, 2]
+
+
+def test_rows_carry_the_spans_of_their_cv():
+    df_cv = pl.DataFrame(
+        {
+            "CANDIDATE_ID": [1, 2, 2],
+            "Gender": ["Female", "Male", "Male"],
+            "Location": ["north", "south", "south"],
+            "length": [1, 2, 3],
+            "Translated_CV": [TEXTS[0], TEXTS[1], TEXTS[3]],
+            "CV_text_anon": ["a", "b", "c"],
+        }
+    )
+    df_parser = pl.DataFrame(
+        {"CANDIDATE_ID": [3], "Skill_Type": ["DRIVERSLIC"], "Skill": ["B"]}
+    )
+    result = compute_candidate_coverage(
+        df_cv,
+        df_parser,
+        "DRIVERSLIC",
+        span_extractor=driver_license_spans,
+        verbose=False,
+    )
+    for row in result.fn_rows.to_dicts():
+        spans = row[SPANS_COLUMN]
+        assert spans
+        assert all(
+            "licen" in row["cv_text"][s["start"] : s["end"]].lower()
+            or row["cv_text"][s["start"] : s["end"]] == "own car"
+            for s in spans
+        )
+    assert result.fn_rows["cv_text"].to_list() == [TEXTS[0], TEXTS[3]]
+
+
+def test_spans_survive_a_csv_round_trip(tmp_path):
+    found = extract_skills(pl.Series(TEXTS), span_extractor=driver_license_spans)
+    path = tmp_path / "fn.csv"
+    found.select(spans_to_json(SPANS_COLUMN)).write_csv(path, separator=";")
+    loaded = pl.read_csv(path, separator=";").select(spans_from_json(SPANS_COLUMN))
+    assert loaded[SPANS_COLUMN].to_list() == found[SPANS_COLUMN].to_list()
+
+
+def test_language_spans_cover_their_context():
+    scanner = LanguageScanner(
+        {"en": {"english"}, "fr": {"french"}, "de": {"german"}},
+        language_left_context_rev,
+        language_right_context,
+    )
+    text = "english b2, knowledge of the french language, german"
+    found = {code: text[start:end] for code, start, end in scanner.spans(text)}
+    assert found == {
+        "en": "english b2",
+        "fr": "knowledge of the french",
+        "de": "german",
+    }
+    assert scanner.scan(text) == set(found)
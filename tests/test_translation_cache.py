@@ -0,0 +1,96 @@
+from concurrent.futures import wait
+
+import pytest
+from google.api_core import exceptions
+
+from hiring_cv_bias.translation import translate
+from hiring_cv_bias.translation.cache import TranslationCache, text_key
+from hiring_cv_bias.translation.translate import TranslationEngine, clean_cv_text
+
+TEXTS = [f"CV anonimizzato: esperienza {i % 90}\npresso Rossi" for i in range(300)]
+EXPECTED = [clean_cv_text(text).upper().strip() for text in TEXTS]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "translations.sqlite")
+
+
+def make_engine(stub_server, cache_path, **kwargs):
+    return TranslationEngine(
+        client_factory=stub_server.client_factory(),
+        cache=TranslationCache(cache_path),
+        max_batch_size=10,
+        max_concurrency=1,
+        backoff=0.001,
+        **kwargs,
+    )
+
+
+def test_put_and_get(cache_path):
+    cache = TranslationCache(cache_path)
+    cache.put_many([("a", "A"), ("b", "B")], "en")
+    assert cache.get_many(["a", "b", "c"], "en") == {"a": "A", "b": "B"}
+    assert len(cache) == 2
+    cache.close()
+    # committed: a new connection sees them
+    assert TranslationCache(cache_path).get_many(["a"], "en") == {"a": "A"}
+
+
+def test_keys_are_hashes_of_the_cleaned_text(stub_server, cache_path):
+    make_engine(stub_server, cache_path).translate(["Ciao\nMondo"])
+    cache = TranslationCache(cache_path)
+    assert cache.get_many([text_key("ciao mondo")], "en") == {
+        text_key("ciao mondo"): "CIAO MONDO"
+    }
+
+
+def test_a_crashed_job_resumes_where_it_stopped(stub_server, cache_path):
+    # 90 distinct CVs in 9 batches; the job dies on the 4th request
+    stub_server.fail_next(200, 200, 200, 400)
+    with pytest.raises(exceptions.BadRequest):
+        make_engine(stub_server, cache_path).translate(TEXTS)
+    assert len(TranslationCache(cache_path)) == 30
+
+    stub_server.requests.clear()
+    assert make_engine(stub_server, cache_path).translate(TEXTS) == EXPECTED
+    # only the 6 batches that were missing are sent
+    assert len(stub_server.requests) == 6
+    assert len(stub_server.segments) == 60
+    assert len(TranslationCache(cache_path)) == 90
+
+
+def test_a_finished_job_sends_nothing(stub_server, cache_path):
+    assert make_engine(stub_server, cache_path).translate(TEXTS) == EXPECTED
+    stub_server.requests.clear()
+    stub_server.actions.clear()
+    assert make_engine(stub_server, cache_path).translate(TEXTS) == EXPECTED
+    assert stub_server.actions == []
+
+
+def test_targets_are_cached_separately(stub_server, cache_path):
+    make_engine(stub_server, cache_path).translate(TEXTS[:5])
+    stub_server.requests.clear()
+    make_engine(stub_server, cache_path, target_language="fr").translate(TEXTS[:5])
+    assert len(stub_server.segments) == 5
+
+    cache = TranslationCache(cache_path)
+    key = text_key(clean_cv_text(TEXTS[0]))
+    assert set(cache.get_many([key], "en")) == {key}
+    assert set(cache.get_many([key], "fr")) == {key}
+    assert cache.get_many([key], "de") == {}
+    assert len(cache) == 10
+
+
+def test_batches_done_before_a_failure_are_stored(stub_server, cache_path, monkeypatch):
+    # the failed batch is seen first although the others finished too, as
+    # when they complete while the failure is being handled
+    def failure_first(futures):
+        wait(futures)
+        yield from sorted(futures, key=lambda f: f.exception() is None)
+
+    monkeypatch.setattr(translate, "as_completed", failure_first)
+    stub_server.fail_next(200, 400, 200)
+    with pytest.raises(exceptions.BadRequest):
+        make_engine(stub_server, cache_path).translate(TEXTS[:30])
+    assert len(TranslationCache(cache_path)) == 20
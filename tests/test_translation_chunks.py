@@ -0,0 +1,103 @@
+from conftest import stub_translation
+
+from hiring_cv_bias.translation.translate import (
+    TranslationEngine,
+    chunk_spans,
+    clean_cv_text,
+    clean_cv_text_indexed,
+    join_chunks,
+    trace_to_source,
+)
+
+SENTENCES = [
+    f"Frase numero {i} del curriculum, con qualche parola in piu. " for i in range(40)
+]
+CV = "".join(SENTENCES).strip()
+# a raw CV the cleaning changes: removed header, newlines, runs of spaces,
+# " ," and upper case
+RAW_CV = 'CV anonimizzato:\n"""' + "\n  ".join(SENTENCES).replace(",", " ,") + '"""'
+
+
+def make_engine(stub_server, **kwargs):
+    return TranslationEngine(
+        client_factory=stub_server.client_factory(), backoff=0.001, **kwargs
+    )
+
+
+def test_chunks_end_after_a_sentence():
+    spans = chunk_spans(CV, 200)
+    assert len(spans) > 1
+    assert spans[0][0] == 0 and spans[-1][1] == len(CV)
+    assert all(end == start for (_, end), (start, _) in zip(spans, spans[1:]))
+    assert all(end - start <= 200 for start, end in spans)
+    assert all(CV[start:end].endswith(". ") for start, end in spans[:-1])
+
+
+def test_without_sentence_ends_chunks_end_after_a_space():
+    text = " ".join(f"parola{i}" for i in range(100))
+    spans = chunk_spans(text, 50)
+    assert "".join(text[start:end] for start, end in spans) == text
+    assert all(end - start <= 50 for start, end in spans)
+    assert all(text[start:end].endswith(" ") for start, end in spans[:-1])
+
+
+def test_without_spaces_chunks_are_cut_hard():
+    text = "x" * 120
+    assert chunk_spans(text, 50) == [(0, 50), (50, 100), (100, 120)]
+
+
+def test_blank_texts_have_no_chunks():
+    assert chunk_spans("") == []
+    assert chunk_spans(" ") == []
+    assert join_chunks([]) == ("", [])
+
+
+def test_every_chunk_is_stripped_the_same_way():
+    assert join_chunks([" uno "]) == ("uno", [(0, 3)])
+    assert join_chunks([" uno ", "due "]) == ("uno due", [(0, 3), (4, 7)])
+
+
+def test_cleaned_characters_map_to_the_raw_text():
+    for raw in [RAW_CV, "  A ,B\n\nİstanbul  , x", "", "CV anonimizzato:"]:
+        cleaned, index = clean_cv_text_indexed(raw)
+        assert cleaned == clean_cv_text(raw)
+        assert len(index) == len(cleaned) + 1 and index[-1] == len(raw)
+        assert index == sorted(index)
+        for i, c in enumerate(cleaned):
+            assert c in raw[index[i]].lower() or (c == " " and raw[index[i]].isspace())
+
+
+def test_translated_chunks_map_back_to_their_source(stub_server):
+    engine = make_engine(stub_server, max_chunk_chars=200)
+    [result], offsets = engine.translate_with_offsets([RAW_CV])
+    assert len(offsets) > 1
+    assert len(stub_server.segments) == len(offsets)
+
+    for chunk in offsets.iter_rows(named=True):
+        translated = result[chunk["translated_start"] : chunk["translated_end"]]
+        # offsets point into the raw text, which cleans to the chunk sent
+        original = RAW_CV[chunk["source_start"] : chunk["source_end"]]
+        assert translated == stub_translation(clean_cv_text(original)).strip()
+        assert original.count("Frase numero") == translated.count("FRASE NUMERO")
+        # a span inside the chunk's translation traces back to the chunk
+        assert trace_to_source(
+            offsets, 0, chunk["translated_start"] + 1, chunk["translated_end"] - 1
+        ) == (chunk["source_start"], chunk["source_end"])
+
+    first, last = offsets.row(0, named=True), offsets.row(-1, named=True)
+    assert trace_to_source(offsets, 0, 0, len(result)) == (
+        first["source_start"],
+        last["source_end"],
+    )
+
+
+def test_empty_texts_are_not_sent(stub_server):
+    engine = make_engine(stub_server)
+    results, offsets = engine.translate_with_offsets(["", "ciao", "  "])
+    assert results == ["", "CIAO", ""]
+    assert stub_server.segments == ["ciao"]
+    assert offsets["row"].to_list() == [1]
+
+    stub_server.requests.clear()
+    assert engine.translate(["", " "]) == ["", ""]
+    assert stub_server.actions == [200]
@@ -0,0 +1,187 @@
+import time
+
+import polars as pl
+import pytest
+from google.api_core import exceptions
+
+from hiring_cv_bias.translation.translate import (
+    TokenBucket,
+    TranslationEngine,
+    clean_cv_text,
+    make_batches,
+)
+
+
+def make_engine(stub_server, **kwargs):
+    kwargs.setdefault("backoff", 0.001)
+    return TranslationEngine(client_factory=stub_server.client_factory(), **kwargs)
+
+
+def expected(texts):
+    return [clean_cv_text(text).upper().strip() for text in texts]
+
+
+def test_translations_come_back_in_input_order(stub_server):
+    texts = [f"CV anonimizzato: esperienza {i}\npresso Rossi" for i in range(300)]
+    stub_server.delay = 0.01
+    engine = make_engine(stub_server, max_concurrency=4, max_batch_size=7)
+    assert engine.translate(texts) == expected(texts)
+    assert all(len(request) <= 7 for request in stub_server.requests)
+
+
+def test_identical_cleaned_texts_are_sent_once(stub_server):
+    texts = ["Esperienza  a Milano", "esperienza a milano", "Altro CV"] * 10
+    engine = make_engine(stub_server)
+    assert engine.translate(texts) == expected(texts)
+    assert sorted(stub_server.segments) == ["altro cv", "esperienza a milano"]
+
+
+def test_one_client_is_shared(stub_server):
+    built = []
+    factory = stub_server.client_factory()
+
+    def counting_factory():
+        built.append(1)
+        return factory()
+
+    engine = TranslationEngine(
+        client_factory=counting_factory, max_concurrency=4, max_batch_size=1
+    )
+    engine.translate([f"cv {i}" for i in range(20)])
+    assert len(built) == 1
+
+
+def test_concurrency_is_limited(stub_server):
+    stub_server.delay = 0.02
+    engine = make_engine(stub_server, max_concurrency=3, max_batch_size=1)
+    engine.translate([f"cv {i}" for i in range(30)])
+    assert stub_server.max_in_flight <= 3
+
+
+def test_batches_respect_both_limits():
+    texts = ["a" * 10, "b" * 10, "c" * 25, "d", "e", "f"]
+    assert make_batches(texts, max_batch_size=2, max_batch_chars=20) == [
+        [0, 1],
+        [2],
+        [3, 4],
+        [5],
+    ]
+    assert make_batches([]) == []
+
+
+@pytest.mark.parametrize(
+    "action",
+    [
+        429,
+        500,
+        503,
+        "drop",
+        "partial",
+        (403, "rateLimitExceeded"),
+        (403, "userRateLimitExceeded"),
+    ],
+)
+def test_transient_errors_are_retried(stub_server, action):
+    stub_server.fail_next(action, action)
+    engine = make_engine(stub_server, max_retries=2)
+    assert engine.translate(["ciao"]) == ["CIAO"]
+
+
+@pytest.mark.parametrize(
+    "action, error",
+    [
+        (429, exceptions.TooManyRequests),
+        (500, exceptions.InternalServerError),
+        (503, exceptions.ServiceUnavailable),
+    ],
+)
+def test_retries_stop_at_the_limit(stub_server, action, error):
+    stub_server.fail_always(action)
+    engine = make_engine(stub_server, max_retries=3)
+    with pytest.raises(error):
+        engine.translate(["ciao"])
+    # the first attempt and three retries
+    assert stub_server.actions == [action] * 4
+
+
+@pytest.mark.parametrize(
+    "action, error",
+    [
+        (400, exceptions.BadRequest),
+        (403, exceptions.Forbidden),
+        ((403, "dailyLimitExceeded"), exceptions.Forbidden),
+    ],
+)
+def test_non_retryable_errors_are_raised_at_once(stub_server, action, error):
+    stub_server.fail_next(action)
+    engine = make_engine(stub_server, max_retries=5)
+    with pytest.raises(error):
+        engine.translate(["ciao"])
+    assert stub_server.actions == [action]
+
+
+def test_translate_series_keeps_nulls(stub_server):
+    engine = make_engine(stub_server)
+    found = engine.translate_series(pl.Series("cv", ["uno", None, "due"]))
+    assert found.to_list() == ["UNO", None, "DUE"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_allows_bursts_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert clock.now == pytest.approx(0.1)
+
+
+def test_token_bucket_holds_the_average_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, capacity=100, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        bucket.acquire(50)
+    # 500 tokens at 100/s after a burst of 100
+    assert clock.now == pytest.approx(4.0)
+
+
+def test_token_bucket_requests_above_capacity_go_into_debt():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+    bucket.acquire(30)
+    assert clock.now == 0.0
+    bucket.acquire(1)
+    # 20 tokens of debt plus the one asked for
+    assert clock.now == pytest.approx(2.1)
+
+
+def test_engine_limits_requests_per_minute(stub_server):
+    # 20 requests/s with bursts of max_concurrency = 2
+    engine = make_engine(
+        stub_server, max_concurrency=2, max_batch_size=1, requests_per_minute=1200
+    )
+    start = time.perf_counter()
+    engine.translate([f"cv {i}" for i in range(12)])
+    assert time.perf_counter() - start >= (12 - 2) / 20 * 0.9
+
+
+def test_engine_limits_characters_per_minute(stub_server):
+    # 10 characters/s after a one-minute burst of 600: 610 characters wait ~1s
+    engine = make_engine(
+        stub_server, max_concurrency=4, max_batch_size=1, chars_per_minute=600
+    )
+    texts = [f"cv n. {i:04}" for i in range(61)]
+    assert {len(clean_cv_text(text)) for text in texts} == {10}
+    start = time.perf_counter()
+    engine.translate(texts)
+    assert time.perf_counter() - start >= 0.9
+    assert len(stub_server.requests) == 61